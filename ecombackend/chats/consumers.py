@@ -1,32 +1,326 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from urllib.parse import parse_qs
+import asyncio
+import collections
 import json
+import time
+
+from users import roles
+from . import framing
+from .history import replay
+from .limits import chat_counters, connection_bucket, user_buckets
+from .presence import presence_store
+from .writer import chat_message_writer
+
+DEFAULT_ROOM = "global"
+
+
+def room_group(room):
+    """Group for everyone in a room (ws/chat/<room>/; plain ws/chat/ is the global room)."""
+    return f"chat_room_{room}"
+
+
+def user_group(user_id):
+    """Group for every socket of one user, for direct messages."""
+    return f"chat_user_{user_id}"
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.room_group_name = "chat_global"
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        self.room = self.scope["url_route"]["kwargs"].get("room", DEFAULT_ROOM)
+        self.room_group_name = room_group(self.room)
+        self.joined_groups = [self.room_group_name]
+        # Only authenticated senders' messages are persisted (ChatMessage.user is required)
+        self.user_id = None
+        self.username = "Anonymous"
+        self.is_admin = False
+        user = self.scope.get("user")
+        if user is not None and user.is_authenticated:
+            self.user_id = user.pk
+            self.username = user.get_username()
+            self.is_admin = (await database_sync_to_async(roles.resolve)(user))["role"] == "admin"
+            self.joined_groups.append(user_group(user.pk))
 
-    async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data["message"]
-        user = data.get("user", "Anonymous")
-
-        # Broadcast message to all clients
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat_message",
-                "message": message,
-                "user": user,
-            }
+        # Opt-in binary framing: clients offering the chat.msgpack subprotocol get msgpack frames
+        subprotocol = None
+        if framing.msgpack_enabled() and framing.MSGPACK_SUBPROTOCOL in self.scope.get("subprotocols", []):
+            subprotocol = framing.MSGPACK_SUBPROTOCOL
+        self.packed = subprotocol is not None
+
+        # Inbound limits: this socket's bucket, plus one shared by all the user's sockets
+        self.bucket = connection_bucket()
+        self.user_bucket = user_buckets.acquire(self.user_id) if self.user_id is not None else None
+        self.throttled = 0
+        self.max_frame_bytes = getattr(settings, "CHAT_MAX_FRAME_BYTES", 16384)
+        self.throttle_disconnect_after = getattr(settings, "CHAT_THROTTLE_DISCONNECT_AFTER", 100)
+        self.closing = False
+
+        for group in self.joined_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept(subprotocol)
+        self.open_outbox()
+
+        if self.user_id is not None:
+            self.presence_touched = time.monotonic()
+            if await presence_store.join(self.room, self.user_id, self.channel_name):
+                await self.broadcast_event({"type": "presence", "user_id": self.user_id, "status": "online"})
+        await self.send_payload({"type": "presence", "room": self.room, "online": await presence_store.online(self.room)})
+        await self.replay_missed()
+
+    async def replay_missed(self):
+        """
+        On reconnect (ws/chat/?last_id=<id> or ?since=<timestamp of the last
+        frame seen>) send what was missed before any live frame, then a
+        {"replay": "done"} marker; "truncated" means page the rest over HTTP.
+        A last_id or since that doesn't parse, or a since without a UTC
+        offset, gets an error frame instead.
+        """
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        after_id = since = None
+        if "last_id" in params:
+            try:
+                after_id = int(params["last_id"][0])
+            except ValueError:
+                await self.send_payload({"type": "error", "error": "invalid_last_id"})
+                return
+        elif "since" in params:
+            # Frames carry 'Z' timestamps; an unencoded '+00:00' arrives as ' 00:00'
+            value = params["since"][0].replace(" ", "+")
+            try:
+                since = parse_datetime(value)
+            except ValueError:
+                since = None
+            if since is None or timezone.is_naive(since):
+                await self.send_payload({"type": "error", "error": "invalid_since"})
+                return
+        else:
+            return
+
+        # Messages this process has queued but not yet written are part of what was missed
+        await chat_message_writer.flush()
+        rows, truncated = await database_sync_to_async(replay)(
+            self.room, user_id=self.user_id, after_id=after_id, since=since
         )
+        for row in rows:
+            payload = {
+                "id": row["id"],
+                "message": row["message"],
+                "user": row["user__username"],
+                "room": row["room"],
+                "timestamp": framing.timestamp(row["timestamp"]),
+                "replayed": True,
+            }
+            if row["recipient_id"] is not None:
+                payload.update(direct=True, to=row["recipient_id"], user_id=row["user_id"])
+            await self.send_payload(payload)
+        await self.send_payload({"replay": "done", "count": len(rows), "truncated": truncated})
+
+    async def disconnect(self, close_code):
+        if getattr(self, "outbox_writer", None) is not None:
+            self.outbox_writer.cancel()
+        if getattr(self, "user_bucket", None) is not None:
+            user_buckets.release(self.user_id)
+        if getattr(self, "user_id", None) is not None:
+            if await presence_store.leave(self.room, self.user_id, self.channel_name):
+                await self.broadcast_event({"type": "presence", "user_id": self.user_id, "status": "offline"})
+        for group in getattr(self, "joined_groups", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await chat_message_writer.flush()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if not await self.admit(len(text_data if text_data is not None else bytes_data or b"")):
+            return
+        data = framing.decode(text_data, bytes_data, self.packed)
+        if data is None:
+            chat_counters["malformed"] += 1
+            return
+
+        kind = data.get("type", "message")
+        if kind == "heartbeat":
+            await self.heartbeat()
+            return
+        if kind == "typing":
+            await self.typing()
+            return
+
+        message = data.get("message")
+        if not isinstance(message, str):
+            chat_counters["malformed"] += 1
+            return
+
+        # Broadcast to the room, or only to one user's sockets for a direct message
+        target = self.room_group_name
+        recipient_id = None
+        if data.get("to_user") is not None:
+            if self.user_id is None:
+                # Anonymous sockets can't be held to account for what they send one user
+                await self.send_payload({"type": "error", "error": "login_required"})
+                return
+            try:
+                recipient_id = int(data["to_user"])
+            except (TypeError, ValueError):
+                return
+            target = user_group(recipient_id)
+
+        sent_at = timezone.now()
+        payload = {
+            "message": message,
+            # Never taken from the frame, so nobody can post under another name
+            "user": self.username,
+            "room": self.room,
+            "timestamp": framing.timestamp(sent_at),
+        }
+        if recipient_id is not None:
+            # Lets clients tell a DM from a room message and file it under the conversation
+            payload.update(direct=True, to=recipient_id, user_id=self.user_id)
+        # Encoded once here; every recipient's consumer forwards these frames as is
+        event = {"type": "chat_message", **framing.encode(payload)}
+        await self.channel_layer.group_send(target, event)
+        if recipient_id is not None and recipient_id != self.user_id:
+            # The sender's other sockets (tabs, devices) show the DM too
+            await self.channel_layer.group_send(user_group(self.user_id), event)
+        # Queued, not written: the broadcast above never waits on the database
+        if self.user_id is not None:
+            chat_message_writer.add(
+                user_id=self.user_id,
+                room=self.room,
+                recipient_id=recipient_id,
+                message=message,
+                is_admin=self.is_admin,
+                timestamp=sent_at,
+            )
+
+    async def admit(self, size):
+        """
+        Take a token for an incoming frame, before any parsing. The client is
+        told once when it starts being throttled and is disconnected if it
+        sends CHAT_THROTTLE_DISCONNECT_AFTER frames in a row regardless.
+        """
+        if self.closing:
+            return False
+        if size > self.max_frame_bytes:
+            chat_counters["oversized"] += 1
+            return False
+        if self.bucket.take() and (self.user_bucket is None or self.user_bucket.take()):
+            chat_counters["received"] += 1
+            self.throttled = 0
+            return True
+
+        chat_counters["throttled"] += 1
+        self.throttled += 1
+        if self.throttled == 1:
+            await self.send_payload({"type": "error", "error": "rate_limited"})
+        elif self.throttle_disconnect_after and self.throttled >= self.throttle_disconnect_after:
+            chat_counters["throttle_disconnects"] += 1
+            await self.shut(4008)
+        return False
+
+    async def shut(self, code):
+        self.closing = True
+        self.outbox.clear()
+        self.outbox_writer.cancel()
+        await self.close(code=code)
+
+    async def heartbeat(self):
+        """Keep this socket in the room's online set; clients send one well within CHAT_PRESENCE_TTL."""
+        if self.user_id is None:
+            return
+        # More frequent heartbeats than a third of the TTL gain nothing, so skip the round trip
+        if time.monotonic() - self.presence_touched < presence_store.ttl / 3:
+            return
+        self.presence_touched = time.monotonic()
+        await presence_store.heartbeat(self.room, self.user_id, self.channel_name)
+
+    async def typing(self):
+        if self.user_id is None:
+            return
+        if await presence_store.typing(self.room, self.user_id):
+            await self.broadcast_event({"type": "typing", "user_id": self.user_id, "room": self.room})
+
+    async def broadcast_event(self, payload):
+        await self.channel_layer.group_send(self.room_group_name, {"type": "chat_event", **framing.encode(payload)})
+
+    async def chat_event(self, event):
+        """Presence and typing events, which are always pre-encoded."""
+        await self.chat_message(event)
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            "message": event["message"],
-            "user": event["user"],
-        }))
+        if "text" not in event:
+            # Sent by a process that predates pre-encoded frames
+            await self.send_payload({
+                "message": event["message"],
+                "user": event["user"],
+                "room": event.get("room", DEFAULT_ROOM),
+                "timestamp": event.get("timestamp"),
+            })
+        elif not self.packed:
+            await self.send_frame(event["text"])
+        elif "packed" in event:
+            # Sent by a process that still pre-packed every message
+            await self.send_frame(event["packed"])
+        else:
+            await self.send_frame(framing.pack_text(event["text"]))
+
+    async def send_payload(self, payload):
+        """Encode and send a payload meant for this socket only."""
+        if self.packed:
+            await self.send_frame(framing.msgpack.packb(payload))
+        else:
+            await self.send_frame(json.dumps(payload))
+
+    def open_outbox(self):
+        """Start the task that writes this socket's queued frames (see send_frame)."""
+        # With an interval, frames arriving within it go out together as one array frame
+        self.coalesce_interval = getattr(settings, "CHAT_COALESCE_INTERVAL", 0)
+        self.outbox_limit = getattr(settings, "CHAT_OUTBOUND_QUEUE_SIZE", 256)
+        self.slow_consumer_policy = getattr(settings, "CHAT_SLOW_CONSUMER_POLICY", "drop")
+        self.outbox = collections.deque()
+        self.outbox_waiter = None
+        self.outbox_writer = asyncio.ensure_future(self.write_outbox())
+
+    async def send_frame(self, frame):
+        """
+        Queue a frame without waiting on the socket, so a slow client never
+        holds up this consumer's handlers. The queue is bounded: when it is
+        full the oldest frame is dropped or, with CHAT_SLOW_CONSUMER_POLICY =
+        "close", the socket is disconnected.
+        """
+        if self.closing:
+            return
+        if len(self.outbox) >= self.outbox_limit:
+            chat_counters["dropped"] += 1
+            if self.slow_consumer_policy == "close":
+                chat_counters["slow_disconnects"] += 1
+                await self.shut(4009)
+                return
+            self.outbox.popleft()
+        self.outbox.append(frame)
+        if self.outbox_waiter is not None and not self.outbox_waiter.done():
+            self.outbox_waiter.set_result(None)
+
+    async def write_outbox(self):
+        while True:
+            if not self.outbox:
+                # Woken by send_frame
+                self.outbox_waiter = asyncio.get_running_loop().create_future()
+                await self.outbox_waiter
+                self.outbox_waiter = None
+            if self.coalesce_interval > 0:
+                await asyncio.sleep(self.coalesce_interval)
+                frames = list(self.outbox)
+                self.outbox.clear()
+                if frames:
+                    await self.write_frame(framing.join_packed(frames) if self.packed else framing.join_text(frames))
+            else:
+                while self.outbox:
+                    await self.write_frame(self.outbox.popleft())
+
+    async def write_frame(self, frame):
+        if self.packed:
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
@@ -0,0 +1,94 @@
+"""
+Websocket frames for chat events.
+
+A message is encoded once, when it is group_sent, and the encoded frame rides
+along in the channel-layer event, so each recipient's consumer only copies
+bytes to its socket instead of re-serializing the same payload. Sockets that
+negotiate the `chat.msgpack` subprotocol get a msgpack frame instead of JSON
+text; msgpack ships with channels_redis, but is treated as optional here.
+
+Only the JSON frame travels in the event, so the channel layer never carries
+the payload twice. The msgpack frame is made from it on the receiving side,
+once per process: every msgpack socket in the process that gets the same
+message reuses it.
+"""
+import functools
+import json
+import struct
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "chat.msgpack"
+# Recently packed messages kept per process; a message is delivered to all of
+# a process's recipients within a few event loop iterations
+PACKED_CACHE_SIZE = 256
+
+# What decoding a client's frame raises when it is not valid JSON/msgpack
+DECODE_ERRORS = (ValueError,) if msgpack is None else (ValueError, msgpack.UnpackException)
+
+
+def msgpack_enabled():
+    return msgpack is not None and getattr(settings, 'CHAT_MSGPACK_SUBPROTOCOL', True)
+
+
+def timestamp(value):
+    """
+    ISO 8601 in UTC with a 'Z' suffix: clients echo it back in ?since=, and a
+    '+00:00' offset comes back as ' 00:00' unless they percent-encode it.
+    """
+    return value.astimezone(dt_timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def encode(payload):
+    """Return the channel-layer fields carrying a payload's pre-encoded frame."""
+    return {"text": json.dumps(payload)}
+
+
+@functools.lru_cache(maxsize=PACKED_CACHE_SIZE)
+def pack_text(text):
+    """The msgpack frame for an encoded JSON frame."""
+    return msgpack.packb(json.loads(text))
+
+
+def decode(text_data=None, bytes_data=None, packed=False):
+    """
+    A client's frame as a dict; None for anything else, including frames that
+    don't parse and binary frames on a socket that didn't negotiate msgpack.
+    """
+    try:
+        if bytes_data is not None and packed:
+            data = msgpack.unpackb(bytes_data)
+        elif text_data is not None:
+            data = json.loads(text_data)
+        else:
+            return None
+    except DECODE_ERRORS:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def join_text(frames):
+    """One JSON text frame for several already-encoded payloads (a JSON array)."""
+    if len(frames) == 1:
+        return frames[0]
+    return "[" + ",".join(frames) + "]"
+
+
+def join_packed(frames):
+    """One msgpack frame for several already-encoded payloads (a msgpack array)."""
+    if len(frames) == 1:
+        return frames[0]
+    count = len(frames)
+    if count < 16:
+        header = bytes([0x90 | count])
+    elif count < 0x10000:
+        header = b"\xdc" + struct.pack(">H", count)
+    else:
+        header = b"\xdd" + struct.pack(">I", count)
+    return header + b"".join(frames)
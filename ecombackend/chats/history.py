@@ -0,0 +1,108 @@
+"""
+Keyset reads of ChatMessage.
+
+History pages are bounded by an opaque (timestamp, id) cursor rather than an
+offset, so every page is one index range scan on (user, timestamp, id) no
+matter how deep the client scrolls. Reconnecting sockets replay what they
+missed with one bounded query on (room, id).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import ChatMessage
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Columns a history row or replayed frame needs; keeps SELECT * off the wire
+MESSAGE_FIELDS = ('id', 'user_id', 'room', 'recipient_id', 'message', 'is_admin', 'timestamp')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, pk):
+    """'<microseconds since epoch>_<id>': exact, URL safe and orderable by the server only."""
+    delta = timestamp - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return f"{micros}_{pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        micros, pk = (int(part) for part in cursor.split('_'))
+    except (AttributeError, ValueError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return EPOCH + timedelta(microseconds=micros), pk
+
+
+def history_limit(value):
+    default = getattr(settings, 'CHAT_HISTORY_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'CHAT_HISTORY_MAX_PAGE_SIZE', 200)
+    if value in (None, ''):
+        return default
+    return max(1, min(int(value), maximum))
+
+
+def page(queryset, before=None, after=None, limit=50):
+    """
+    One page of messages around a cursor.
+
+    Without a cursor, or with `before`, rows come newest first from that point
+    back; with `after` they come oldest first from that point forward, so a
+    client catching up reads them in the order they were sent. Returns
+    (rows, cursors) where cursors holds the `before`/`after` values for the
+    neighbouring pages: `before` is None once the oldest message has been
+    read, `after` is always set so a client can poll for newer messages.
+    """
+    if before is not None and after is not None:
+        raise InvalidCursor("Pass either before or after, not both")
+    if after is not None:
+        timestamp, pk = decode_cursor(after)
+        # timestamp__gte bounds the index range; the Q only trims the tie at its edge
+        queryset = queryset.filter(timestamp__gte=timestamp).filter(Q(timestamp__gt=timestamp) | Q(id__gt=pk))
+        queryset = queryset.order_by('timestamp', 'id')
+    else:
+        if before is not None:
+            timestamp, pk = decode_cursor(before)
+            queryset = queryset.filter(timestamp__lte=timestamp).filter(Q(timestamp__lt=timestamp) | Q(id__lt=pk))
+        queryset = queryset.order_by('-timestamp', '-id')
+
+    # One extra row tells whether there is another page without a COUNT
+    rows = list(queryset.values(*MESSAGE_FIELDS)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    cursors = {'before': None, 'after': after}
+    if rows:
+        oldest, newest = (rows[0], rows[-1]) if after is not None else (rows[-1], rows[0])
+        if after is not None or more:
+            cursors['before'] = encode_cursor(oldest['timestamp'], oldest['id'])
+        cursors['after'] = encode_cursor(newest['timestamp'], newest['id'])
+    return rows, cursors
+
+
+def replay(room, user_id=None, after_id=None, since=None, limit=None):
+    """
+    Messages a reconnecting socket missed, oldest first: the room's messages
+    plus direct messages to user_id, after message id `after_id` or, for
+    clients that only saw live frames, after timestamp `since`.
+
+    Returns (rows, truncated); truncated means more than `limit` were missed
+    and the client should page the rest from the history API.
+    """
+    if limit is None:
+        limit = getattr(settings, 'CHAT_REPLAY_LIMIT', 200)
+    audience = Q(room=room, recipient__isnull=True)
+    if user_id is not None:
+        audience |= Q(recipient_id=user_id)
+    queryset = ChatMessage.objects.filter(audience)
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id).order_by('id')
+    else:
+        queryset = queryset.filter(timestamp__gt=since).order_by('timestamp', 'id')
+
+    rows = list(queryset.values(*MESSAGE_FIELDS, 'user__username')[:limit + 1])
+    return rows[:limit], len(rows) > limit
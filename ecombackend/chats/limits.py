@@ -0,0 +1,72 @@
+"""
+Inbound rate limits and counters for ChatConsumer.
+
+Every frame a client sends costs one token from its connection's bucket and
+one from its user's bucket, which all of that user's sockets in this process
+share, so opening more sockets buys no extra rate. Frames without a token are
+dropped before they are even parsed. Counters are per process, like the
+search cache's, and are served by ChatStatsAPI.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, tokens=1):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+def connection_bucket():
+    return TokenBucket(
+        getattr(settings, 'CHAT_CONNECTION_RATE', 5),
+        getattr(settings, 'CHAT_CONNECTION_BURST', 20),
+    )
+
+
+class UserBuckets:
+    """One bucket per user, kept while they have a socket open in this process."""
+
+    def __init__(self):
+        self._buckets = {}
+
+    def acquire(self, user_id):
+        bucket, sockets = self._buckets.get(user_id) or (None, 0)
+        if bucket is None:
+            bucket = TokenBucket(
+                getattr(settings, 'CHAT_USER_RATE', 10),
+                getattr(settings, 'CHAT_USER_BURST', 40),
+            )
+        self._buckets[user_id] = (bucket, sockets + 1)
+        return bucket
+
+    def release(self, user_id):
+        bucket, sockets = self._buckets.get(user_id) or (None, 0)
+        if sockets <= 1:
+            self._buckets.pop(user_id, None)
+        else:
+            self._buckets[user_id] = (bucket, sockets - 1)
+
+
+user_buckets = UserBuckets()
+
+# received: frames accepted; throttled: frames refused by a bucket;
+# oversized: frames over CHAT_MAX_FRAME_BYTES; malformed: accepted frames
+# that weren't a JSON/msgpack object with a message; dropped: outbound frames
+# shed from a full socket queue; throttle_disconnects / slow_disconnects:
+# sockets closed for flooding or for not keeping up.
+chat_counters = Counter()
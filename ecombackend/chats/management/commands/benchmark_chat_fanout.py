@@ -0,0 +1,83 @@
+import asyncio
+import statistics
+import time
+
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chats.consumers import room_group
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure channel-layer fan-out for chat rooms: N simulated sockets spread over R "
+        "room groups, reporting deliveries/second and p50/p99 delivery latency. Uses its "
+        "own key prefix, which it flushes afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=10000, help='Simulated sockets (default: 10000)')
+        parser.add_argument('--rooms', type=int, default=100, help='Rooms the sockets are spread over (default: 100)')
+        parser.add_argument('--messages', type=int, default=500, help='Messages to send (default: 500)')
+        parser.add_argument('--hosts', help='Comma-separated Redis URLs (default: CHANNEL_REDIS_HOSTS)')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for deliveries (default: 60)')
+
+    def handle(self, *args, **options):
+        hosts = options['hosts'].split(',') if options['hosts'] else settings.CHANNEL_REDIS_HOSTS
+        sockets, rooms = max(options['sockets'], 1), max(min(options['rooms'], options['sockets']), 1)
+        self.stdout.write(f"{sockets} sockets in {rooms} rooms across {len(hosts)} Redis host(s)")
+        result = asyncio.run(self.run(hosts, sockets, rooms, max(options['messages'], 1), options['timeout']))
+
+        latencies = sorted(result['latencies'])
+        if not latencies:
+            raise CommandError("No messages were delivered")
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"sent {result['sent']} messages, delivered {len(latencies)}/{result['expected']} "
+            f"in {result['elapsed']:.2f}s ({len(latencies) / result['elapsed']:.0f} deliveries/s)"
+        )
+        self.stdout.write(
+            f"latency p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms"
+        )
+
+    async def run(self, hosts, sockets, rooms, messages, timeout):
+        layer = RedisChannelLayer(hosts=hosts, prefix='chatbench', capacity=max(messages, 100))
+        channels = [await layer.new_channel() for _ in range(sockets)]
+        members = [0] * rooms
+        # In small batches: each pending group_add holds one of the layer's pooled connections
+        for start in range(0, sockets, 50):
+            await asyncio.gather(*(
+                layer.group_add(room_group(f'bench{i % rooms}'), channels[i])
+                for i in range(start, min(start + 50, sockets))
+            ))
+        for i in range(sockets):
+            members[i % rooms] += 1
+        expected = sum(members[m % rooms] for m in range(messages))
+
+        latencies = []
+        done = asyncio.Event()
+
+        async def socket(channel):
+            while True:
+                event = await layer.receive(channel)
+                latencies.append(time.monotonic() - event['sent'])
+                if len(latencies) >= expected:
+                    done.set()
+
+        receivers = [asyncio.create_task(socket(channel)) for channel in channels]
+        started = time.monotonic()
+        for m in range(messages):
+            await layer.group_send(room_group(f'bench{m % rooms}'), {'type': 'chat.message', 'sent': time.monotonic()})
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.monotonic() - started
+
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        await layer.flush()
+        return {'sent': messages, 'expected': expected, 'elapsed': elapsed, 'latencies': latencies}
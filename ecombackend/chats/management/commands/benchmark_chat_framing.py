@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from chats import framing
+from chats.consumers import ChatConsumer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure CPU per delivered chat message in ChatConsumer's delivery path: every "
+        "message fanned out to N in-process consumers, comparing per-recipient json.dumps "
+        "(events without pre-encoded frames), frames encoded once at group_send, msgpack "
+        "framing and coalesced frames."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=1000, help='Recipients per message (default: 1000)')
+        parser.add_argument('--messages', type=int, default=200, help='Messages to fan out (default: 200)')
+        parser.add_argument('--size', type=int, default=200, help='Message text length (default: 200)')
+        parser.add_argument('--burst', type=int, default=20, help='Messages per burst when coalescing (default: 20)')
+        parser.add_argument(
+            '--coalesce-interval', type=float, default=0.05,
+            help='CHAT_COALESCE_INTERVAL for the coalesced run, in seconds (default: 0.05)',
+        )
+
+    def handle(self, *args, **options):
+        sockets, messages = max(options['sockets'], 1), max(options['messages'], 1)
+        scenarios = [
+            ('per-recipient json', dict(encoded=False, packed=False, interval=0)),
+            ('encoded once, json', dict(encoded=True, packed=False, interval=0)),
+            ('encoded once, coalesced json', dict(encoded=True, packed=False, interval=options['coalesce_interval'])),
+        ]
+        if framing.msgpack_enabled():
+            scenarios.insert(2, ('encoded once, msgpack', dict(encoded=True, packed=True, interval=0)))
+        else:
+            self.stdout.write("msgpack unavailable or disabled; skipping the msgpack run")
+
+        self.stdout.write(f"{messages} messages x {sockets} recipients, {options['size']} character text")
+        baseline = None
+        for name, scenario in scenarios:
+            result = asyncio.run(self.run(sockets, messages, options['size'], max(options['burst'], 1), **scenario))
+            per_message = result['cpu'] / result['delivered'] * 1e6
+            baseline = baseline or per_message
+            self.stdout.write(
+                f"{name:<30} {per_message:6.2f} us CPU/delivered message ({baseline / per_message:4.1f}x), "
+                f"{result['frames']} frames, {result['bytes'] / result['delivered']:.0f} bytes/message"
+            )
+
+    async def run(self, sockets, messages, size, burst, encoded, packed, interval):
+        stats = {'frames': 0, 'bytes': 0}
+
+        async def sink(message):
+            stats['frames'] += 1
+            stats['bytes'] += len(message.get('bytes') or message.get('text') or '')
+
+        consumers = []
+        for _ in range(sockets):
+            consumer = ChatConsumer()
+            consumer.base_send = sink
+            consumer.packed = packed
+            consumer.closing = False
+            consumer.open_outbox()
+            consumer.coalesce_interval = interval
+            consumers.append(consumer)
+
+        text = 'x' * size
+        cpu = 0.0
+        for start in range(0, messages, burst if interval else messages):
+            started = time.process_time()
+            for m in range(start, min(start + (burst if interval else messages), messages)):
+                payload = {"message": f"{m} {text}", "user": "bench", "room": "bench", "timestamp": "2025-01-01T00:00:00+00:00"}
+                if encoded:
+                    # What ChatConsumer.receive puts on the channel layer
+                    event = {"type": "chat_message", **framing.encode(payload)}
+                else:
+                    # Events as group_sent before pre-encoding: each recipient runs json.dumps
+                    event = {"type": "chat_message", **payload}
+                for consumer in consumers:
+                    await consumer.chat_message(event)
+                if not interval:
+                    # Let each socket's outbox writer send the frame
+                    await asyncio.sleep(0)
+            # Wall time spent waiting for a coalesced flush isn't counted: process_time excludes sleep
+            while any(consumer.outbox for consumer in consumers):
+                await asyncio.sleep(0.001)
+            cpu += time.process_time() - started
+
+        for consumer in consumers:
+            consumer.outbox_writer.cancel()
+        return {'cpu': cpu, 'delivered': messages * sockets, **stats}
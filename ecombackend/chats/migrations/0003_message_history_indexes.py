@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 11:21
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Built CONCURRENTLY so chat writes aren't blocked on a large table
+    atomic = False
+
+    dependencies = [
+        ('chats', '0002_message_room_recipient'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='chats_msg_user_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'id'], name='chats_msg_room_id_idx'),
+        ),
+    ]
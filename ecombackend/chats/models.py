@@ -1,8 +1,23 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class ChatMessage(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Room the message was sent to, or the recipient of a direct message
+    room = models.CharField(max_length=64, default='global')
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name='received_chat_messages'
+    )
     message = models.TextField()
     is_admin = models.BooleanField(default=False)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the consumer receives the message, not when its batch is written
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Keyset history per user (chats.history.page) on (timestamp, id)
+            models.Index(fields=['user', 'timestamp', 'id'], name='chats_msg_user_ts_idx'),
+            # Reconnect replay of a room since a message id (chats.history.replay)
+            models.Index(fields=['room', 'id'], name='chats_msg_room_id_idx'),
+        ]
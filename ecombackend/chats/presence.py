@@ -0,0 +1,182 @@
+"""
+Chat presence and typing indicators.
+
+Each open socket of an authenticated user is a member of its room's online
+set, scored by when it expires; connect adds it, heartbeats push the expiry
+out by CHAT_PRESENCE_TTL and disconnect removes it. A socket whose process
+died simply stops being refreshed and drops out of the set, and the set key
+itself carries a TTL so abandoned rooms disappear. A user is online in a
+room while any of their sockets is.
+
+Typing indicators are throttled with a key that lives for
+CHAT_TYPING_INTERVAL: only the event that manages to create it is broadcast,
+so a room sees at most one typing event per user per interval, whichever
+process the user's sockets are on.
+
+RedisPresenceStore keeps this in Redis (CHAT_PRESENCE_REDIS_URL);
+MemoryPresenceStore is the single-process stand-in used when no URL is set.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def room_key(room):
+    return f'chat:presence:{room}'
+
+
+def typing_key(room, user_id):
+    return f'chat:typing:{room}:{user_id}'
+
+
+def member(user_id, connection):
+    return f'{user_id}:{connection}'
+
+
+def member_users(members):
+    users = set()
+    for value in members:
+        if isinstance(value, bytes):
+            value = value.decode()
+        users.add(int(value.split(':', 1)[0]))
+    return users
+
+
+class MemoryPresenceStore:
+
+    def __init__(self, ttl=60, typing_interval=3):
+        self.ttl = ttl
+        self.typing_interval = typing_interval
+        self._rooms = {}
+        self._typing = {}
+
+    async def join(self, room, user_id, connection):
+        """Add a socket; True if the user was not already online in the room."""
+        online = self._prune(room)
+        was_online = user_id in member_users(online)
+        online[member(user_id, connection)] = time.time() + self.ttl
+        return not was_online
+
+    async def heartbeat(self, room, user_id, connection):
+        self._prune(room)[member(user_id, connection)] = time.time() + self.ttl
+
+    async def leave(self, room, user_id, connection):
+        """Remove a socket; True if it was the user's last one in the room."""
+        online = self._prune(room)
+        online.pop(member(user_id, connection), None)
+        if not online:
+            self._rooms.pop(room, None)
+        return user_id not in member_users(online)
+
+    async def online(self, room):
+        return sorted(member_users(self._prune(room)))
+
+    async def typing(self, room, user_id):
+        """True if a typing event may be broadcast now, False while throttled."""
+        now = time.time()
+        key = typing_key(room, user_id)
+        if self._typing.get(key, 0) > now:
+            return False
+        self._typing = {k: expires for k, expires in self._typing.items() if expires > now}
+        self._typing[key] = now + self.typing_interval
+        return True
+
+    def _prune(self, room):
+        now = time.time()
+        online = self._rooms.setdefault(room, {})
+        for key in [key for key, expires in online.items() if expires <= now]:
+            del online[key]
+        return online
+
+
+class RedisPresenceStore:
+
+    def __init__(self, url, ttl=60, typing_interval=3):
+        self.url = url
+        self.ttl = ttl
+        self.typing_interval = typing_interval
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(self.url)
+        return self._client
+
+    async def join(self, room, user_id, connection):
+        """Add a socket; True if the user was not already online in the room."""
+        now = time.time()
+        key = room_key(room)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zremrangebyscore(key, '-inf', now)
+                pipe.zrange(key, 0, -1)
+                pipe.zadd(key, {member(user_id, connection): now + self.ttl})
+                pipe.pexpire(key, int(self.ttl * 1000))
+                _, members, _, _ = await pipe.execute()
+        except Exception:
+            logger.warning("Presence store unavailable", exc_info=True)
+            return False
+        return user_id not in member_users(members)
+
+    async def heartbeat(self, room, user_id, connection):
+        key = room_key(room)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, {member(user_id, connection): time.time() + self.ttl})
+                pipe.pexpire(key, int(self.ttl * 1000))
+                await pipe.execute()
+        except Exception:
+            logger.warning("Presence store unavailable", exc_info=True)
+
+    async def leave(self, room, user_id, connection):
+        """Remove a socket; True if it was the user's last one in the room."""
+        key = room_key(room)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zrem(key, member(user_id, connection))
+                pipe.zremrangebyscore(key, '-inf', time.time())
+                pipe.zrange(key, 0, -1)
+                _, _, members = await pipe.execute()
+        except Exception:
+            logger.warning("Presence store unavailable", exc_info=True)
+            return False
+        return user_id not in member_users(members)
+
+    async def online(self, room):
+        key = room_key(room)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zremrangebyscore(key, '-inf', time.time())
+                pipe.zrange(key, 0, -1)
+                _, members = await pipe.execute()
+        except Exception:
+            logger.warning("Presence store unavailable", exc_info=True)
+            return []
+        return sorted(member_users(members))
+
+    async def typing(self, room, user_id):
+        """True if a typing event may be broadcast now, False while throttled."""
+        try:
+            return bool(await self.client.set(
+                typing_key(room, user_id), 1, nx=True, px=int(self.typing_interval * 1000)
+            ))
+        except Exception:
+            logger.warning("Presence store unavailable", exc_info=True)
+            return False
+
+
+def presence_store_from_settings():
+    ttl = getattr(settings, 'CHAT_PRESENCE_TTL', 60)
+    typing_interval = getattr(settings, 'CHAT_TYPING_INTERVAL', 3)
+    url = getattr(settings, 'CHAT_PRESENCE_REDIS_URL', None)
+    if url:
+        return RedisPresenceStore(url, ttl=ttl, typing_interval=typing_interval)
+    return MemoryPresenceStore(ttl=ttl, typing_interval=typing_interval)
+
+
+presence_store = presence_store_from_settings()
@@ -3,4 +3,5 @@ from .consumers import ChatConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/chat/$', ChatConsumer.as_asgi()),
+    re_path(r'ws/chat/(?P<room>[A-Za-z0-9_-]{1,64})/$', ChatConsumer.as_asgi()),
 ]
@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from .models import ChatMessage
 
-class ChatMessageSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = ChatMessage
-        fields = "__all__"
+
+class ChatMessageSerializer(serializers.Serializer):
+    """Read-only; renders ChatMessage instances or chats.history value rows alike."""
+    id = serializers.IntegerField(read_only=True)
+    user = serializers.IntegerField(source='user_id', read_only=True)
+    room = serializers.CharField(read_only=True)
+    recipient = serializers.IntegerField(source='recipient_id', read_only=True, allow_null=True)
+    message = serializers.CharField(read_only=True)
+    is_admin = serializers.BooleanField(read_only=True)
+    timestamp = serializers.DateTimeField(read_only=True)
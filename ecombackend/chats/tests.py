@@ -1,3 +1,84 @@
-from django.test import TestCase
+import asyncio
+import threading
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+
+from .models import ChatMessage
+from .writer import ChatMessageWriter
+
+
+class GatedWriter(ChatMessageWriter):
+    """Holds every batch on the worker thread until the test opens the gate."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gate = threading.Event()
+
+    def _write(self, batch):
+        self.gate.wait(5)
+        super()._write(batch)
+
+
+class ChatMessageWriterTests(TransactionTestCase):
+    # Batches are written on a worker thread with its own connection, so rows
+    # must really be committed for the test (and the writer) to see them
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender', password='pass')
+
+    def add(self, writer, count):
+        for i in range(count):
+            writer.add(user_id=self.user.pk, room='lobby', message=f'message {i}')
+
+    async def wait_for_written(self, writer, count):
+        async def written():
+            while writer.written < count:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(written(), timeout=5)
+
+    async def stored(self):
+        return await ChatMessage.objects.filter(user=self.user).acount()
+
+    async def test_full_batch_is_written_without_waiting_for_the_interval(self):
+        writer = ChatMessageWriter(batch_size=3, flush_interval=60)
+        self.add(writer, 3)
+        self.assertEqual(writer.stats()['writing'], 3)
+        await self.wait_for_written(writer, 3)
+        self.assertEqual(await self.stored(), 3)
+
+    async def test_partial_batch_is_written_after_the_interval(self):
+        writer = ChatMessageWriter(batch_size=100, flush_interval=0.05)
+        self.add(writer, 2)
+        self.assertEqual(writer.stats()['pending'], 2)
+        self.assertEqual(writer.stats()['writing'], 0)
+        await self.wait_for_written(writer, 2)
+        self.assertEqual(await self.stored(), 2)
+
+    async def test_flush_waits_for_the_batch_in_flight(self):
+        writer = GatedWriter(batch_size=2, flush_interval=60)
+        self.add(writer, 3)  # two in flight, one waiting for the next batch
+        flush = asyncio.ensure_future(writer.flush())
+        await asyncio.sleep(0.05)
+        self.assertFalse(flush.done())
+        writer.gate.set()
+        await asyncio.wait_for(flush, timeout=5)
+        self.assertEqual(writer.written, 3)
+        self.assertEqual(await self.stored(), 3)
+
+    async def test_messages_past_max_pending_are_dropped(self):
+        writer = GatedWriter(batch_size=2, flush_interval=60, max_pending=3)
+        self.add(writer, 5)
+        self.assertEqual(writer.stats()['dropped'], 2)
+        writer.gate.set()
+        await asyncio.wait_for(writer.flush(), timeout=5)
+        self.assertEqual(writer.stats()['written'], 3)
+        self.assertEqual(await self.stored(), 3)
+
+    async def test_shutdown_writes_pending_messages(self):
+        writer = ChatMessageWriter(batch_size=100, flush_interval=60)
+        self.add(writer, 2)
+        await sync_to_async(writer.shutdown)()
+        self.assertEqual(writer.stats()['pending'], 0)
+        self.assertEqual(await self.stored(), 2)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import ChatHistoryAPI
+from .views import ChatHistoryAPI, ChatStatsAPI
 
 urlpatterns = [
     path('chat/<int:user_id>/', ChatHistoryAPI.as_view(), name='chat_history'),
+    path('chat/stats/', ChatStatsAPI.as_view(), name='chat_stats'),
 ]
@@ -1,11 +1,54 @@
+from django.db.models import Q
 from django.shortcuts import render
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from users.permissions import IsAdmin
+from users.roles import get_role
+from .history import InvalidCursor, history_limit, page
+from .limits import chat_counters
 from .models import ChatMessage
 from .serializers import ChatMessageSerializer
+from .writer import chat_message_writer
 
 class ChatHistoryAPI(APIView):
+    """
+    A user's messages, newest first. Page back with ?before=<cursor> and
+    forward (oldest first) with ?after=<cursor>, using the cursors returned
+    with each page; ?limit= sets the page size. Callers only see messages
+    they sent or received, unless they are admins.
+    """
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, user_id):
         messages = ChatMessage.objects.filter(user_id=user_id)
-        serializer = ChatMessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        if get_role(request) != "admin":
+            messages = messages.filter(Q(user=request.user) | Q(recipient=request.user))
+        try:
+            limit = history_limit(request.GET.get("limit"))
+            rows, cursors = page(
+                messages,
+                before=request.GET.get("before"),
+                after=request.GET.get("after"),
+                limit=limit,
+            )
+        except InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "before": cursors["before"],
+            "after": cursors["after"],
+            "results": ChatMessageSerializer(rows, many=True).data,
+        })
+
+# Per-process chat counters: frames received, throttled and dropped, and message writes
+class ChatStatsAPI(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({
+            "frames": dict(chat_counters),
+            "writer": chat_message_writer.stats(),
+        })
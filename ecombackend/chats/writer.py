@@ -0,0 +1,148 @@
+"""
+Write-behind ChatMessage writer.
+
+ChatConsumer only appends the message to an in-memory batch and goes on to
+broadcast it; the batch is bulk_created every CHAT_WRITE_BATCH_SIZE messages
+or CHAT_WRITE_FLUSH_INTERVAL seconds, whichever comes first, on a worker
+thread so a slow database never holds up the event loop. Only one batch is
+written at a time; messages arriving meanwhile make up the next batch, so a
+slow database gets bigger INSERTs rather than more concurrent ones, and once
+CHAT_WRITE_MAX_PENDING messages are queued or being written new ones are
+dropped. Consumers flush on disconnect and whatever is still pending is
+written at interpreter exit.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMessageWriter:
+
+    def __init__(self, batch_size=100, flush_interval=0.2, max_pending=10000, enabled=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._pending = []
+        self._timer = None
+        self._timer_loop = None
+        self._writing = None
+        self._in_flight = 0
+        self._settled = 0
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            batch_size=getattr(settings, 'CHAT_WRITE_BATCH_SIZE', 100),
+            flush_interval=getattr(settings, 'CHAT_WRITE_FLUSH_INTERVAL', 0.2),
+            max_pending=getattr(settings, 'CHAT_WRITE_MAX_PENDING', 10000),
+            enabled=getattr(settings, 'CHAT_PERSIST_MESSAGES', True),
+        )
+
+    def add(self, **fields):
+        """Queue a message for the next batch; must be called on the event loop, never waits."""
+        if not self.enabled:
+            return
+        if len(self._pending) + self._in_flight >= self.max_pending:
+            # The database has fallen this far behind; shed rather than grow without bound
+            self.dropped += 1
+            return
+        self._pending.append(ChatMessage(**fields))
+        self.enqueued += 1
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+        if self._write_running():
+            # The next batch starts when this one finishes
+            return
+        loop = asyncio.get_running_loop()
+        if len(self._pending) >= self.batch_size:
+            self._start_write()
+        elif self._timer is None or self._timer_loop is not loop:
+            self._timer = loop.call_later(self.flush_interval, self._start_write)
+            self._timer_loop = loop
+
+    async def flush(self):
+        """Write everything queued so far and wait until it has been written."""
+        target = self.enqueued
+        self._start_write()
+        while self._write_running() and self._settled < target:
+            # Shielded: a cancelled flush must not abort a batch other consumers' messages are in
+            await asyncio.shield(self._writing)
+
+    def stats(self):
+        return {
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'pending': len(self._pending),
+            'writing': self._in_flight,
+        }
+
+    def shutdown(self):
+        """Synchronously write whatever is still pending (registered with atexit)."""
+        batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    def _write_running(self):
+        if self._writing is None:
+            return False
+        if self._writing.get_loop().is_closed():
+            # Left behind by an event loop that has gone away; it will never finish
+            self._writing, self._in_flight = None, 0
+            return False
+        return True
+
+    def _start_write(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._write_running() or not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        # Not thread-sensitive: a slow INSERT must not queue up behind (or
+        # block) the shared sync thread the rest of the consumers use.
+        write = database_sync_to_async(self._write, thread_sensitive=False)
+        self._in_flight = len(batch)
+        self._writing = asyncio.get_running_loop().create_task(write(batch))
+        self._writing.add_done_callback(self._write_done)
+
+    def _write_done(self, task):
+        if task is not self._writing:
+            return
+        self._settled += self._in_flight
+        self._writing, self._in_flight = None, 0
+        self._start_write()
+
+    def _write(self, batch):
+        try:
+            ChatMessage.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception("Failed to write %d chat messages", len(batch))
+            with self._lock:
+                self.failed += len(batch)
+            connection.close()
+            return
+        with self._lock:
+            self.written += len(batch)
+
+
+chat_message_writer = ChatMessageWriter.from_settings()
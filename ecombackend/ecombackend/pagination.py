@@ -0,0 +1,187 @@
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, OrderBy, Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 2000
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination ordered by the queryset's own ordering, falling
+    back to the model's Meta.ordering, so each endpoint pages on the column its
+    indexes are built for (-submitted_at, -sale_date, -created_at, ...).
+
+    The primary key is appended as a tiebreak and the cursor holds the values
+    of every ordering column, not just the first as CursorPagination's does,
+    so a page boundary falling among rows that share a timestamp neither skips
+    nor repeats any of them.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        model = queryset.model
+        ordering = ordering_names(queryset.query.order_by, queryset)
+        if ordering is None:
+            ordering = ordering_names(model._meta.ordering, queryset) or ['-pk']
+        # Break ties on the primary key so every row has its own position
+        if not {'pk', '-pk', model._meta.pk.name, f'-{model._meta.pk.name}'} & set(ordering):
+            ordering.append('-pk' if ordering[0].startswith('-') else 'pk')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset, filtering on the whole position.
+        # Positions are unique, so its offsets are never needed.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*reversed_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.keyset_filter(current_position, reverse))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def keyset_filter(self, position, reverse):
+        """
+        Rows after `position` in page order: (a, b, pk) > (x, y, z) expanded to
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > z), each
+        comparison flipped for descending columns and for backward pages.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        after = Q(pk__in=[])
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            name = order.lstrip('-')
+            after |= equal & beyond(name, value, descending=order.startswith('-') != reverse)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return after
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            attr = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if attr is None else str(attr))
+        return json.dumps(values)
+
+
+def ordering_names(ordering, queryset):
+    """
+    `ordering` as 'name' / '-name' strings, or None when an entry can't be
+    read back off a row: an expression other than a plain F() (with the
+    default NULL placement, which keyset_filter assumes), a relation
+    or a lookup across one, or random ordering.
+    """
+    if not ordering:
+        return None
+    names = []
+    for order in ordering:
+        if isinstance(order, OrderBy) and isinstance(order.expression, F):
+            if order.nulls_first or order.nulls_last:
+                return None
+            order = f"{'-' if order.descending else ''}{order.expression.name}"
+        if not isinstance(order, str):
+            return None
+        name = order.lstrip('-')
+        if name != 'pk' and name not in queryset.query.annotations:
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation:
+                return None
+        names.append(order)
+    return names
+
+
+def reversed_ordering(ordering):
+    """Flip every 'name' / '-name' entry, for walking a page backwards."""
+    return tuple(order[1:] if order.startswith('-') else f'-{order}' for order in ordering)
+
+
+def beyond(name, value, descending):
+    """Rows past `value` on one column; NULLs sort after every value ascending, as in PostgreSQL."""
+    if descending:
+        return Q(**{f'{name}__isnull': False}) if value is None else Q(**{f'{name}__lt': value})
+    if value is None:
+        return Q(pk__in=[])
+    return Q(**{f'{name}__gt': value}) | Q(**{f'{name}__isnull': True})
+
+
+def wants_stream(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
+
+def stream_json_lines(queryset, serializer_class, context=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream a queryset as JSON lines. Rows are fetched through a server-side
+    cursor in chunks, so the full result set is never held in memory.
+    """
+    encoder = JSONEncoder()
+
+    def rows():
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield encoder.encode(serializer_class(obj, context=context).data) + '\n'
+
+    return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+
+
+def list_response(request, queryset, serializer_class, view=None, context=None):
+    """Return a cursor-paginated response, or a JSON lines stream when ?stream=1."""
+    if wants_stream(request):
+        return stream_json_lines(queryset, serializer_class, context=context)
+    paginator = KeysetCursorPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True, context=context)
+    return paginator.get_paginated_response(serializer.data)
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'users',
     'forms_app',
@@ -140,17 +141,120 @@ STATIC_URL = 'static/'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'ecombackend.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Cached role lookups for users.permissions (users.roles); entries are also
+# dropped whenever a UserRole or group membership changes.
+ROLE_CACHE_TTL = 3600  # seconds
+
+# Outbound calls to the social login providers (users.providers)
+SOCIAL_HTTP_CONNECT_TIMEOUT = 3.05  # seconds
+SOCIAL_HTTP_READ_TIMEOUT = 10
+# Cap on one call including its retries, backoff and body
+SOCIAL_HTTP_TOTAL_TIMEOUT = 15
+SOCIAL_HTTP_RETRIES = 2
+SOCIAL_HTTP_BACKOFF = 0.3
+SOCIAL_HTTP_POOL_SIZE = 20
+# Point providers elsewhere, e.g. at `manage.py run_stub_provider`:
+# SOCIAL_PROVIDER_URLS = {'tiktok': 'http://127.0.0.1:8765', 'facebook': ..., 'instagram_api': ..., 'instagram_graph': ...}
+SOCIAL_PROVIDER_URLS = {}
+# Provider user info is cached per (provider, open id) for this long; Facebook
+# only reveals the id in the user info call itself, so it is never cached.
+SOCIAL_USER_INFO_TTL = 300  # seconds
+
+# SearchLog rows are queued and bulk-written by a background thread
+# (productsearch.logwriter); set SEARCH_LOG_ASYNC = False to write inline.
+SEARCH_LOG_ASYNC = True
+SEARCH_LOG_BATCH_SIZE = 500
+SEARCH_LOG_FLUSH_INTERVAL = 0.5  # seconds
+SEARCH_LOG_MAX_QUEUE = 10000
+# Raw SearchLog rows older than this are deleted by `rollup_search_logs --prune`
+# once rolled up into SearchQueryHourly.
+SEARCH_LOG_RETENTION_DAYS = 30
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config('REDIS_CACHE_URL', default='redis://127.0.0.1:6379/1'),
+    },
+}
+
+# Search results are cached per process (LRU bounded by entries and bytes)
+# and in CACHES['default']; any ProductForm save/delete invalidates them.
+SEARCH_CACHE_TTL = 60  # seconds
+SEARCH_CACHE_LOCAL_MAX_ENTRIES = 1000
+SEARCH_CACHE_LOCAL_MAX_BYTES = 16 * 1024 * 1024
+
+# productManagement bulk stock endpoint: rows per UPDATE ... FROM (VALUES) chunk
+STOCK_BULK_CHUNK_SIZE = 1000
+STOCK_BULK_MAX_ROWS = 100000
+CATALOG_IMPORT_BATCH_SIZE = 1000
+# Low-stock threshold for products without a category (see Category.low_stock_threshold)
+LOW_STOCK_DEFAULT_THRESHOLD = 5
+PRICE_LOOKUP_MAX_PRODUCTS = 10000
+# Raw StockHistory older than this is compacted into daily rows by compact_stock_history
+STOCK_HISTORY_RETENTION_DAYS = 90
+# Older StockSnapshot checkpoints are pruned, keeping each product's newest one
+STOCK_SNAPSHOT_RETENTION_DAYS = 90
+
 ASGI_APPLICATION = "backend.asgi.application"
 
+# Chat messages from authenticated users are persisted write-behind
+# (chats.writer): bulk-written every CHAT_WRITE_BATCH_SIZE messages or
+# CHAT_WRITE_FLUSH_INTERVAL seconds and on disconnect, never before broadcast.
+CHAT_PERSIST_MESSAGES = True
+CHAT_WRITE_BATCH_SIZE = 100
+CHAT_WRITE_FLUSH_INTERVAL = 0.2  # seconds
+CHAT_WRITE_MAX_PENDING = 10000
+# chats.history: history API page sizes and how many missed messages a
+# reconnecting socket is replayed before it has to page over HTTP
+CHAT_HISTORY_PAGE_SIZE = 50
+CHAT_HISTORY_MAX_PAGE_SIZE = 200
+CHAT_REPLAY_LIMIT = 200
+# Offer the chat.msgpack websocket subprotocol (needs msgpack, which
+# channels_redis already depends on); JSON text frames otherwise.
+CHAT_MSGPACK_SUBPROTOCOL = True
+# When > 0, frames for a socket are held this long and sent together as one
+# JSON/msgpack array frame; 0 sends every message as its own frame.
+CHAT_COALESCE_INTERVAL = 0  # seconds
+# Inbound token buckets (chats.limits): per socket, and per user across their
+# sockets in one process. Frames over the rate are dropped; a client that
+# keeps sending this many throttled frames in a row is disconnected (0: never).
+CHAT_CONNECTION_RATE = 5  # frames/second
+CHAT_CONNECTION_BURST = 20
+CHAT_USER_RATE = 10  # frames/second
+CHAT_USER_BURST = 40
+CHAT_THROTTLE_DISCONNECT_AFTER = 100
+CHAT_MAX_FRAME_BYTES = 16384
+# Outbound frames queued per socket; when full, "drop" sheds the oldest and
+# "close" disconnects the slow client.
+CHAT_OUTBOUND_QUEUE_SIZE = 256
+CHAT_SLOW_CONSUMER_POLICY = "drop"
+
+# Comma-separated Redis URLs. With more than one, channels_redis shards groups
+# and channels across them by consistent hashing, so each chat room's fan-out
+# lands on one host instead of every room sharing a single hot key.
+CHANNEL_REDIS_HOSTS = [
+    host.strip() for host in config('CHANNEL_REDIS_HOSTS', default='redis://127.0.0.1:6379').split(',') if host.strip()
+]
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+            "hosts": CHANNEL_REDIS_HOSTS,
         },
     },
 }
 
+# Chat presence sets and typing throttles (chats.presence) live in this Redis;
+# None keeps them in process memory, which is only right for a single process.
+CHAT_PRESENCE_REDIS_URL = CHANNEL_REDIS_HOSTS[0] if CHANNEL_REDIS_HOSTS else None
+# Sockets not heard from (connect or heartbeat) for this long count as offline
+CHAT_PRESENCE_TTL = 60  # seconds
+# At most one typing event per user and room per interval
+CHAT_TYPING_INTERVAL = 3  # seconds
+
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class FormsAppConfig(AppConfig):
     name = 'forms_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from forms_app.models import FormSchema
+from forms_app.search import apply_field_indexes, indexed_form_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the per-field submission indexes forms have asked for since the last run, "
+        "rebuild INVALID ones left by a failed concurrent build and drop those of deleted "
+        "forms. Meant to run from cron or a job queue, never inside a request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slug', action='append', dest='slugs',
+                            help='Only sync this form (can be repeated)')
+        parser.add_argument('--all', action='store_true',
+                            help='Check every form, not only pending ones')
+
+    def handle(self, *args, **options):
+        forms = FormSchema.objects.all()
+        if options['slugs']:
+            forms = forms.filter(slug__in=options['slugs'])
+        elif not options['all']:
+            forms = forms.filter(pk__in=indexed_form_ids(invalid_only=True)) | forms.filter(field_indexes_pending=True)
+
+        for form in forms.only('pk', 'slug', 'field_indexes').iterator():
+            created, dropped = apply_field_indexes(form.pk, form.field_indexes)
+            # Left pending if the form was saved with a different index set meanwhile
+            FormSchema.objects.filter(pk=form.pk, field_indexes=form.field_indexes).update(field_indexes_pending=False)
+            if created or dropped:
+                self.stdout.write(f"{form.slug}: created {len(created)}, dropped {len(dropped)}")
+
+        if not options['slugs']:
+            orphaned = indexed_form_ids() - set(FormSchema.objects.values_list('pk', flat=True))
+            for form_schema_id in sorted(orphaned):
+                _, dropped = apply_field_indexes(form_schema_id, {})
+                self.stdout.write(f"deleted form {form_schema_id}: dropped {len(dropped)}")
+
+        self.stdout.write(self.style.SUCCESS("Submission indexes in sync"))
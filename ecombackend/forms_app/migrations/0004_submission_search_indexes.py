@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 10:44
+
+import django.contrib.postgres.indexes
+import forms_app.models
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built CONCURRENTLY so submissions stay writable
+    atomic = False
+
+    dependencies = [
+        ('forms_app', '0003_formschema_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=r"""
+                CREATE OR REPLACE FUNCTION forms_app_try_numeric(value text) RETURNS numeric AS $$
+                    SELECT CASE
+                        WHEN value ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$' THEN value::numeric
+                    END
+                $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+            """,
+            reverse_sql="DROP FUNCTION IF EXISTS forms_app_try_numeric(text);",
+        ),
+        AddIndexConcurrently(
+            model_name='formsubmission',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['data'], name='forms_submission_data_gin', opclasses=['jsonb_path_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='formsubmission',
+            index=django.contrib.postgres.indexes.GinIndex(forms_app.models.SubmissionDocument(), name='forms_submission_doc_gin'),
+        ),
+    ]
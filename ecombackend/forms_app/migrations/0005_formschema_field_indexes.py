@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-18 11:41
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of forms_app.search.desired_field_indexes() as of this
+# migration, so later changes there can't change what it records
+NUMERIC_FIELD_TYPES = {'number', 'integer', 'decimal', 'currency'}
+FIELD_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,100}$')
+
+
+def desired_field_indexes(form):
+    indexes = {}
+    for field in form.fields_structure:
+        if not field.get('filterable') or not FIELD_ID_RE.match(str(field.get('id', ''))):
+            continue
+        kind = 'numeric' if field.get('type') in NUMERIC_FIELD_TYPES else 'text'
+        digest = hashlib.md5(f"{field['id']}:{kind}".encode()).hexdigest()[:10]
+        indexes[f'forms_sub_{form.pk}_{digest}'] = [field['id'], kind]
+    return indexes
+
+
+def record_field_indexes(apps, schema_editor):
+    # Existing forms already have their indexes; record them so the first
+    # sync_submission_indexes run only verifies them instead of dropping them
+    FormSchema = apps.get_model('forms_app', 'FormSchema')
+    for form in FormSchema.objects.only('pk', 'fields_structure').iterator():
+        FormSchema.objects.filter(pk=form.pk).update(field_indexes=desired_field_indexes(form))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0004_submission_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formschema',
+            name='field_indexes',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='formschema',
+            name='field_indexes_pending',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(record_field_indexes, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.crypto import get_random_string
 
 
@@ -8,6 +10,24 @@ def generate_unique_slug():
     return get_random_string(8)
 
 
+class SubmissionDocument(models.Func):
+    """
+    Full-text document over every string and number value in a submission.
+    Must stay identical to the expression in the GIN index below.
+    """
+    template = "jsonb_to_tsvector('simple'::regconfig, %(expressions)s, '[\"string\", \"numeric\"]'::jsonb)"
+    output_field = SearchVectorField()
+
+    def __init__(self, expression='data', **extra):
+        super().__init__(expression, **extra)
+
+
+class TryNumeric(models.Func):
+    """Cast text to numeric, NULL when it isn't a number (see migration 0004)."""
+    function = 'forms_app_try_numeric'
+    output_field = models.DecimalField()
+
+
 class FormSchema(models.Model):
     """
     Stores the structure/blueprint of a user-created form.
@@ -44,6 +64,11 @@ class FormSchema(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False) 
+
+    # Per-field submission indexes this form wants (index name -> [field id,
+    # kind]); recorded on save, built by the sync_submission_indexes command
+    field_indexes = models.JSONField(default=dict, editable=False)
+    field_indexes_pending = models.BooleanField(default=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -82,6 +107,8 @@ class FormSubmission(models.Model):
         indexes = [
             models.Index(fields=['-submitted_at']),
             models.Index(fields=['form_schema', '-submitted_at']),
+            GinIndex(fields=['data'], opclasses=['jsonb_path_ops'], name='forms_submission_data_gin'),
+            GinIndex(SubmissionDocument(), name='forms_submission_doc_gin'),
         ]
         
     def __str__(self):
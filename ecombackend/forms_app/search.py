@@ -0,0 +1,194 @@
+"""
+Submission search over FormSubmission.data.
+
+Free text goes through the jsonb_to_tsvector GIN index, equality filters use
+the jsonb_path_ops GIN index, and fields marked "filterable": true in a form's
+fields_structure get their own partial expression index so equality and range
+filters on them stay index scans.
+
+Saving a form only records the indexes it wants (FormSchema.field_indexes,
+see forms_app.signals); the DDL is run by the sync_submission_indexes
+command, never in a request.
+"""
+import hashlib
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.db.models import Q
+from django.db.models.fields.json import KeyTextTransform
+from rest_framework.exceptions import ValidationError
+
+from .models import FormSubmission, SubmissionDocument, TryNumeric
+
+NUMERIC_FIELD_TYPES = {'number', 'integer', 'decimal', 'currency'}
+RANGE_LOOKUPS = ('gte', 'lte', 'gt', 'lt')
+# Largest power of ten a double holds (sys.float_info.max_10_exp)
+MAX_NUMBER_EXPONENT = 308
+FIELD_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,100}$')
+INDEX_PREFIX = 'forms_sub_'
+INDEX_NAME_RE = re.compile(r'^forms_sub_(\d+)_[0-9a-f]{10}$')
+
+
+def field_kind(field):
+    return 'numeric' if field.get('type') in NUMERIC_FIELD_TYPES else 'text'
+
+
+def filterable_fields(form_schema):
+    """Map of field id -> kind for fields marked filterable with an indexable id."""
+    return {
+        field['id']: field_kind(field)
+        for field in form_schema.fields_structure
+        if field.get('filterable') and FIELD_ID_RE.match(str(field.get('id', '')))
+    }
+
+
+def field_expression(field_id, kind):
+    """Expression matching the per-field index built by apply_field_indexes()."""
+    expression = KeyTextTransform(field_id, 'data')
+    if kind == 'numeric':
+        return TryNumeric(expression)
+    return expression
+
+
+def parse_number(key, value):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({key: f"'{value}' is not a number"})
+    # NaN and Infinity parse, but int() raises on them and they aren't valid JSON
+    if not number.is_finite():
+        raise ValidationError({key: f"'{value}' is not a finite number"})
+    # Past a double's range float() gives inf, and int() of 1e999999 takes seconds
+    if number.adjusted() > MAX_NUMBER_EXPONENT:
+        raise ValidationError({key: f"'{value}' is out of range"})
+    return number
+
+
+def search_submissions(form_schema, params):
+    """
+    Filter a form's submissions from query params:
+      search=<text>                  full-text match on any string/number value
+      filter_<field>=<value>         equality
+      filter_<field>__gte=<value>    range (also __gt, __lte, __lt)
+    Values are typed by the field's type in fields_structure.
+    """
+    submissions = form_schema.submissions.all()
+
+    search = params.get('search')
+    if search:
+        submissions = submissions.alias(document=SubmissionDocument()).filter(
+            document=SearchQuery(search, config='simple', search_type='websearch')
+        )
+
+    fields = {field.get('id'): field for field in form_schema.fields_structure}
+    filterable = filterable_fields(form_schema)
+
+    for position, (key, value) in enumerate(params.items()):
+        if not key.startswith('filter_'):
+            continue
+        field_id, lookup = key[len('filter_'):], 'exact'
+        head, sep, tail = field_id.rpartition('__')
+        if sep and tail in RANGE_LOOKUPS:
+            field_id, lookup = head, tail
+
+        kind = field_kind(fields.get(field_id, {}))
+        typed = parse_number(key, value) if kind == 'numeric' else value
+
+        if lookup == 'exact' and field_id not in filterable:
+            if kind == 'numeric':
+                # Numbers may be stored as JSON numbers or as strings
+                number = int(typed) if typed == typed.to_integral_value() else float(typed)
+                submissions = submissions.filter(
+                    Q(data__contains={field_id: number}) | Q(data__contains={field_id: value})
+                )
+            else:
+                submissions = submissions.filter(data__contains={field_id: value})
+            continue
+
+        alias = f'filter_value_{position}'
+        submissions = submissions.alias(**{alias: field_expression(field_id, kind)}).filter(
+            **{f'{alias}__{lookup}': typed}
+        )
+
+    return submissions
+
+
+def index_name(form_schema_id, field_id, kind):
+    digest = hashlib.md5(f'{field_id}:{kind}'.encode()).hexdigest()[:10]
+    return f'{INDEX_PREFIX}{form_schema_id}_{digest}'
+
+
+def desired_field_indexes(form_schema):
+    """Index name -> [field id, kind] for each of a form's filterable fields."""
+    return {
+        index_name(form_schema.pk, field_id, kind): [field_id, kind]
+        for field_id, kind in filterable_fields(form_schema).items()
+    }
+
+
+def field_indexes(cursor, form_schema_id=None):
+    """Existing per-field index names (of one form, or of all) -> whether the index is valid."""
+    pattern = f'{INDEX_PREFIX}{int(form_schema_id)}\\_%' if form_schema_id is not None else 'forms\\_sub\\_%'
+    cursor.execute(
+        """
+        SELECT c.relname, i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_class t ON t.oid = i.indrelid
+        WHERE t.relname = %s AND c.relname LIKE %s
+        """,
+        [FormSubmission._meta.db_table, pattern],
+    )
+    return {name: valid for name, valid in cursor.fetchall() if INDEX_NAME_RE.match(name)}
+
+
+def indexed_form_ids(invalid_only=False):
+    """Ids of forms that have per-field indexes, or only those with an INVALID one."""
+    if connection.vendor != 'postgresql':
+        return set()
+    with connection.cursor() as cursor:
+        indexes = field_indexes(cursor)
+    return {
+        int(INDEX_NAME_RE.match(name).group(1))
+        for name, valid in indexes.items()
+        if not (invalid_only and valid)
+    }
+
+
+def apply_field_indexes(form_schema_id, desired):
+    """
+    Create the desired indexes of a form and drop the ones no longer wanted.
+    An INVALID index, left behind by a failed CREATE INDEX CONCURRENTLY, is
+    dropped and built again. Returns (created, dropped) names.
+    """
+    if connection.vendor != 'postgresql' or form_schema_id is None:
+        return [], []
+
+    table = FormSubmission._meta.db_table
+    qn = connection.ops.quote_name
+    # CONCURRENTLY is not allowed inside a transaction block
+    concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY '
+
+    with connection.cursor() as cursor:
+        existing = field_indexes(cursor, form_schema_id)
+        invalid = {name for name, valid in existing.items() if not valid}
+
+        dropped = sorted((existing.keys() - desired.keys()) | invalid)
+        for name in dropped:
+            cursor.execute(f'DROP INDEX {concurrently}IF EXISTS {qn(name)}')
+
+        created = sorted(desired.keys() - (existing.keys() - invalid))
+        for name in created:
+            field_id, kind = desired[name]
+            # field_id is restricted to FIELD_ID_RE, so it is safe to inline
+            expression = f"(data ->> '{field_id}')"
+            if kind == 'numeric':
+                expression = f'forms_app_try_numeric{expression}'
+            cursor.execute(
+                f'CREATE INDEX {concurrently}IF NOT EXISTS {qn(name)} ON {qn(table)} '
+                f'(({expression})) WHERE form_schema_id = {int(form_schema_id)}'
+            )
+
+    return created, dropped
@@ -24,6 +24,9 @@ class FormSchemaSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', 'created_at', 'updated_at']
 
     def get_submission_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        if hasattr(obj, 'submission_count'):
+            return obj.submission_count
         return obj.submissions.count()
 
     def validate_language_config(self, value):
@@ -39,6 +42,8 @@ class FormSchemaSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Each field must have 'id' and 'type'")
             if 'labels' not in field or not isinstance(field['labels'], dict):
                 raise serializers.ValidationError("Each field must have a 'labels' dictionary")
+            if not isinstance(field.get('filterable', False), bool):
+                raise serializers.ValidationError("'filterable' must be true or false")
         return value
 
 
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from .models import FormSchema
+from .search import desired_field_indexes
+
+# Only the wanted index set is recorded on save; building indexes over the
+# whole submissions table is left to `manage.py sync_submission_indexes`,
+# which also drops the indexes of deleted forms.
+
+
+@receiver(pre_save, sender=FormSchema)
+def record_filterable_field_indexes(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    # Compare with the stored row, not the instance: a stale instance must not
+    # mark a form pending again (or synced) just by being saved
+    current = FormSchema.objects.filter(pk=instance.pk).values('field_indexes', 'field_indexes_pending').first()
+    if current is None:
+        return
+    desired = desired_field_indexes(instance)
+    instance.field_indexes = desired
+    instance.field_indexes_pending = current['field_indexes_pending'] or current['field_indexes'] != desired
+
+
+@receiver(post_save, sender=FormSchema)
+def record_new_form_field_indexes(sender, instance, created, update_fields=None, **kwargs):
+    # New forms only have a pk (part of the index names) now; saves with
+    # update_fields skip the columns pre_save filled in
+    if not created and (update_fields is None or 'field_indexes' in update_fields):
+        return
+    desired = desired_field_indexes(instance)
+    forms = FormSchema.objects.filter(pk=instance.pk)
+    if not created:
+        forms = forms.exclude(field_indexes=desired)
+    if forms.update(field_indexes=desired, field_indexes_pending=True):
+        instance.field_indexes = desired
+        instance.field_indexes_pending = True
@@ -11,6 +11,9 @@ from .serializers import (
     # FormFileSerializer if needed
 )
 from users.permissions import IsSuperEmployee
+from users.roles import has_group
+from .search import search_submissions
+from ecombackend.pagination import list_response
 
 
 class FormSchemaViewSet(viewsets.ModelViewSet):
@@ -63,7 +66,7 @@ class FormSchemaViewSet(viewsets.ModelViewSet):
         form = self.get_object()
 
         
-        if not request.user.groups.filter(name='Super Employee').exists():
+        if not has_group(request, 'Super Employee'):
             return Response(
                 {"error": "Only Super Employees can delete forms."},
                 status=status.HTTP_403_FORBIDDEN
@@ -93,21 +96,10 @@ class FormSchemaViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def submissions(self, request, slug=None):
-        """Get all submissions for a specific form"""
+        """Get submissions for a specific form, cursor-paginated (or ?stream=1 for JSON lines)"""
         form = self.get_object()
-        submissions = form.submissions.all()
-
-        search = request.query_params.get('search', None)
-        if search:
-            submissions = submissions.filter(data__icontains=search)
-
-        for key, value in request.query_params.items():
-            if key.startswith('filter_'):
-                field_id = key.replace('filter_', '')
-                submissions = submissions.filter(data__contains={field_id: value})
-
-        serializer = FormSubmissionListSerializer(submissions, many=True)
-        return Response(serializer.data)
+        submissions = search_submissions(form, request.query_params).prefetch_related('files')
+        return list_response(request, submissions, FormSubmissionListSerializer, view=self)
 
     @action(detail=True, methods=['get'])
     def related_data(self, request, slug=None):
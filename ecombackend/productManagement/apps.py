@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ProductmanagementConfig(AppConfig):
     name = 'productManagement'
+
+    def ready(self):
+        from . import signals  # noqa: F401
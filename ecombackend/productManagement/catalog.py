@@ -0,0 +1,147 @@
+"""
+Streaming catalog import.
+
+CSV or NDJSON files are read one row at a time and handled in fixed-size
+batches. Each batch is validated with CatalogRowSerializer, has its category
+names resolved through a map loaded once, and is upserted by sku with a
+single bulk_create(update_conflicts=True). Memory use depends on the batch
+size, not the file size.
+"""
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Category, PriceHistory, Product
+from .stock import read_csv_rows
+
+FORMATS = ('csv', 'ndjson')
+
+
+class CatalogRowSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=100)
+    name = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    current_stock = serializers.IntegerField(required=False, default=0)
+    category = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+
+
+def detect_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_ndjson_rows(uploaded_file):
+    """Yield one object per non-blank line; lines that aren't JSON objects yield None."""
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig')
+    try:
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+    finally:
+        text.detach()
+
+
+def read_rows(uploaded_file, file_format):
+    if file_format == 'ndjson':
+        return read_ndjson_rows(uploaded_file)
+    return read_csv_rows(uploaded_file)
+
+
+class CatalogImporter:
+    """
+    Upsert products from an iterable of row dicts.
+
+    New products get every column. Existing ones (matched by sku) get their
+    name, price and category updated, but stock is left to stock movements.
+    """
+    update_fields = ['name', 'price', 'category']
+
+    def __init__(self, batch_size=1000, create_categories=True, max_errors=100, progress=None):
+        self.batch_size = max(batch_size, 1)
+        self.create_categories = create_categories
+        self.max_errors = max_errors
+        self.progress = progress
+        self.categories = None
+        self.stats = {'rows': 0, 'upserted': 0, 'invalid': 0, 'categories_created': 0, 'errors': []}
+
+    def run(self, rows):
+        # Names aren't unique: the oldest category with a name wins
+        self.categories = {}
+        for pk, name in Category.objects.order_by('pk').values_list('pk', 'name').iterator():
+            self.categories.setdefault(name.strip().lower(), pk)
+        rows = iter(rows)
+        first_row = self.stats['rows'] + 1
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return self.stats
+            self.import_batch(batch, first_row)
+            first_row += len(batch)
+            if self.progress:
+                self.progress(self.stats)
+
+    def import_batch(self, batch, first_row):
+        self.stats['rows'] += len(batch)
+        # One serializer per batch: building one per row costs more than validating it
+        validator = CatalogRowSerializer()
+        valid = []
+        for number, row in enumerate(batch, start=first_row):
+            if row is None:
+                self.error(number, "row is not a JSON object")
+                continue
+            # Blank CSV cells mean "not given", so defaults apply
+            row = {key: value for key, value in row.items() if key is not None and value not in ('', None)}
+            try:
+                valid.append(validator.run_validation(row))
+            except serializers.ValidationError as exc:
+                self.error(number, exc.detail)
+
+        # ON CONFLICT can't touch one row twice per statement: last row for a sku wins
+        by_sku = {data['sku']: data for data in valid}
+        with transaction.atomic():
+            category_ids = self.resolve_categories({data['category'] for data in by_sku.values()})
+            products = [
+                Product(
+                    sku=data['sku'],
+                    name=data['name'],
+                    price=data['price'],
+                    current_stock=data['current_stock'],
+                    category_id=category_ids.get(data['category'].strip().lower()),
+                )
+                for data in by_sku.values()
+            ]
+            # Lock the rows being updated so their old prices can't change under us
+            old_prices = {
+                sku: (pk, price)
+                for sku, pk, price in Product.objects.select_for_update()
+                .filter(sku__in=by_sku).values_list('sku', 'pk', 'price')
+            }
+            Product.objects.bulk_create(
+                products, update_conflicts=True, unique_fields=['sku'], update_fields=self.update_fields
+            )
+            PriceHistory.record(
+                (pk, old_price, by_sku[sku]['price']) for sku, (pk, old_price) in old_prices.items()
+            )
+            Product.refresh_low_stock(product_ids=[product.pk for product in products])
+        self.stats['upserted'] += len(products)
+
+    def resolve_categories(self, names):
+        wanted = {name.strip().lower(): name.strip() for name in names if name.strip()}
+        missing = [name for key, name in wanted.items() if key not in self.categories]
+        if missing and self.create_categories:
+            for category in Category.objects.bulk_create([Category(name=name) for name in missing]):
+                self.categories[category.name.lower()] = category.pk
+            self.stats['categories_created'] += len(missing)
+        return self.categories
+
+    def error(self, row_number, detail):
+        self.stats['invalid'] += 1
+        if len(self.stats['errors']) < self.max_errors:
+            self.stats['errors'].append({'row': row_number, 'errors': detail})
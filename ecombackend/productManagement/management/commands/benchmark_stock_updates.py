@@ -0,0 +1,79 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from productManagement.models import Product, StockBusy, InsufficientStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one product's stock from many threads through Product.adjust_stock "
+        "and check that no movement was lost. Uses a throwaway product."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent workers (default: 16)')
+        parser.add_argument('--iterations', type=int, default=200, help='Movements per worker (default: 200)')
+        parser.add_argument('--mode', choices=['atomic', 'reserve'], default='atomic',
+                            help='adjust_stock mode to exercise (default: atomic)')
+        parser.add_argument('--initial-stock', type=int, default=1000, help='Starting stock (default: 1000)')
+
+    def handle(self, *args, **options):
+        threads, iterations = max(options['threads'], 1), max(options['iterations'], 1)
+        reserve = options['mode'] == 'reserve'
+        product = Product.objects.create(
+            name='Stock benchmark', sku=f'bench-{uuid.uuid4().hex[:12]}',
+            price=0, current_stock=options['initial_stock'],
+        )
+        counts = {'applied': 0, 'net': 0, 'busy': 0, 'insufficient': 0}
+        lock = threading.Lock()
+
+        def worker(n):
+            applied = net = busy = insufficient = 0
+            try:
+                for i in range(iterations):
+                    # Mostly sales with the odd restock, like a real hot SKU
+                    qty = 5 if i % 10 == 0 else -1
+                    try:
+                        Product.adjust_stock(product.pk, qty, 'sale' if qty < 0 else 'purchase', reserve=reserve)
+                    except StockBusy:
+                        busy += 1
+                    except InsufficientStock:
+                        insufficient += 1
+                    else:
+                        applied += 1
+                        net += qty
+            finally:
+                connection.close()
+            with lock:
+                counts['applied'] += applied
+                counts['net'] += net
+                counts['busy'] += busy
+                counts['insufficient'] += insufficient
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(worker, range(threads)))
+            elapsed = time.perf_counter() - started
+
+            product.refresh_from_db()
+            expected = options['initial_stock'] + counts['net']
+            history = product.stock_history.count()
+            self.stdout.write(
+                f"{options['mode']}: {counts['applied']} applied, {counts['busy']} skipped busy, "
+                f"{counts['insufficient']} insufficient in {elapsed:.2f}s "
+                f"({counts['applied'] / elapsed:.0f} movements/s)"
+            )
+            if product.current_stock != expected or history != counts['applied']:
+                raise CommandError(
+                    f"Lost updates: stock {product.current_stock} (expected {expected}), "
+                    f"{history} history rows (expected {counts['applied']})"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Final stock {product.current_stock} matches"))
+        finally:
+            product.delete()
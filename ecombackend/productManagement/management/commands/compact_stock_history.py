@@ -0,0 +1,39 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from productManagement.models import StockHistoryDaily, StockSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint the stock of products that moved since their last checkpoint at the "
+        "start of today (UTC), prune checkpoints past their retention window and compact "
+        "raw StockHistory older than the retention window into daily rows. Run daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int,
+                            help='Keep raw movements this many days (default: STOCK_HISTORY_RETENTION_DAYS)')
+        parser.add_argument('--snapshot-retention-days', type=int,
+                            help='Keep snapshots this many days (default: STOCK_SNAPSHOT_RETENTION_DAYS)')
+        parser.add_argument('--no-snapshot', action='store_true', help='Skip the checkpoint and pruning')
+        parser.add_argument('--no-compact', action='store_true', help='Skip compaction')
+
+    def handle(self, *args, **options):
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+        retention = options['retention_days'] or getattr(settings, 'STOCK_HISTORY_RETENTION_DAYS', 90)
+
+        if not options['no_snapshot']:
+            written = StockSnapshot.take(today)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} stock snapshots at {today} 00:00 UTC"))
+            keep = options['snapshot_retention_days'] or getattr(settings, 'STOCK_SNAPSHOT_RETENTION_DAYS', 90)
+            pruned = StockSnapshot.prune(today - timedelta(days=keep))
+            self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} stock snapshots older than {keep} days"))
+
+        if not options['no_compact']:
+            before = today - timedelta(days=retention)
+            compacted = StockHistoryDaily.compact(before)
+            self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} movements dated before {before}"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from productManagement.catalog import FORMATS, CatalogImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or NDJSON catalog file into Product, upserting by sku."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (sku,name,price[,current_stock,category]) or NDJSON file')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension (.ndjson/.jsonl or csv)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per upsert (default: 1000)')
+        parser.add_argument('--no-create-categories', action='store_true',
+                            help='Leave unknown category names unset instead of creating them')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        importer = CatalogImporter(
+            batch_size=options['batch_size'],
+            create_categories=not options['no_create_categories'],
+            progress=lambda stats: self.stdout.write(
+                f"  {stats['rows']} rows read, {stats['upserted']} upserted, {stats['invalid']} invalid"
+            ),
+        )
+        try:
+            with open(options['path'], 'rb') as source:
+                stats = importer.run(read_rows(source, file_format))
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for error in stats['errors']:
+            self.stderr.write(f"  row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['upserted']} products from {stats['rows']} rows "
+            f"({stats['invalid']} invalid, {stats['categories_created']} categories created)"
+        ))
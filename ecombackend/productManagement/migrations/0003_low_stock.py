@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_low_stock(apps, schema_editor):
+    Category = apps.get_model('productManagement', 'Category')
+    Product = apps.get_model('productManagement', 'Product')
+    threshold = Coalesce(
+        Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('low_stock_threshold')[:1]),
+        Value(getattr(settings, 'LOW_STOCK_DEFAULT_THRESHOLD', 5)),
+    )
+    Product.objects.filter(current_stock__lte=threshold).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productManagement', '0002_product_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(default=5, help_text='Products in this category at or below this stock are low on stock'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['-created_at'], name='pm_product_low_stock_idx'),
+        ),
+        migrations.RunPython(backfill_low_stock, migrations.RunPython.noop),
+    ]
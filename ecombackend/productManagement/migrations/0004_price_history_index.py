@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productManagement', '0003_low_stock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(fields=['product', 'changed_at'], name='pm_price_history_product_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0 on 2026-10-18 11:09
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # The StockHistory index is built CONCURRENTLY so stock movements aren't blocked
+    atomic = False
+
+    dependencies = [
+        ('productManagement', '0004_price_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockHistoryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('change_type', models.CharField(max_length=50)),
+                ('quantity', models.IntegerField(default=0)),
+                ('movements', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='stockhistory',
+            index=models.Index(fields=['product', 'timestamp'], name='pm_stock_history_product_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockhistorydaily',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_history_daily', to='productManagement.product'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='productManagement.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockhistorydaily',
+            constraint=models.UniqueConstraint(fields=('product', 'day', 'change_type'), name='pm_stock_daily_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'taken_at'), name='pm_stock_snapshot_uniq'),
+        ),
+    ]
@@ -1,8 +1,29 @@
-from django.db import models
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def day_start(day):
+    """Midnight UTC at the start of `day`; stock days are UTC days, as for SalesDailyFact."""
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+class StockBusy(Exception):
+    """Another transaction holds the product row (reserve mode only)."""
+
+
+class InsufficientStock(Exception):
+    """A reserve-mode decrement would take stock below zero."""
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
+    low_stock_threshold = models.PositiveIntegerField(
+        default=5, help_text='Products in this category at or below this stock are low on stock'
+    )
 
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -10,16 +31,267 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     current_stock = models.IntegerField(default=0)
+    # Maintained by refresh_low_stock() on every stock or threshold change
+    is_low_stock = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['-created_at'], condition=Q(is_low_stock=True), name='pm_product_low_stock_idx'),
+        ]
+
+    @classmethod
+    def refresh_low_stock(cls, product_ids=None, category_ids=None):
+        """
+        Recompute is_low_stock against each product's category threshold
+        (LOW_STOCK_DEFAULT_THRESHOLD when uncategorized). Only rows whose flag
+        actually flips are written.
+        """
+        products = cls.objects.all()
+        if product_ids is not None:
+            products = products.filter(pk__in=product_ids)
+        if category_ids is not None:
+            products = products.filter(category_id__in=category_ids)
+        threshold = Coalesce(
+            Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('low_stock_threshold')[:1]),
+            Value(getattr(settings, 'LOW_STOCK_DEFAULT_THRESHOLD', 5)),
+        )
+        low = Q(current_stock__lte=threshold)
+        products.filter(low, is_low_stock=False).update(is_low_stock=True)
+        products.filter(~low, is_low_stock=True).update(is_low_stock=False)
+
+    @classmethod
+    def prices_at(cls, when, products):
+        """
+        Annotate `products` (a Product queryset) with `effective_price`, the
+        price in force at `when`, in one query: the last change at or before
+        `when`, else the old price of the first change after it, else the
+        current price. Products created after `when` get None.
+        """
+        changes = PriceHistory.objects.filter(product=OuterRef('pk'))
+        return products.annotate(
+            effective_price=Case(
+                When(created_at__gt=when, then=None),
+                default=Coalesce(
+                    Subquery(changes.filter(changed_at__lte=when).order_by('-changed_at', '-pk').values('new_price')[:1]),
+                    Subquery(changes.filter(changed_at__gt=when).order_by('changed_at', 'pk').values('old_price')[:1]),
+                    F('price'),
+                ),
+                output_field=cls._meta.get_field('price'),
+            )
+        )
+
+    @classmethod
+    def adjust_stock(cls, product_id, quantity, change_type='manual_update', reserve=False):
+        """
+        Add `quantity` (negative for outgoing stock) to a product and record
+        the movement in StockHistory, in one transaction. Returns the new level.
+
+        By default this is a single UPDATE ... SET current_stock = current_stock + n,
+        so concurrent movements never overwrite each other. With reserve=True
+        the row is locked with SELECT ... FOR UPDATE SKIP LOCKED first: if
+        another transaction holds it StockBusy is raised instead of waiting,
+        and a decrement below zero raises InsufficientStock.
+        """
+        with transaction.atomic():
+            if reserve:
+                product = (
+                    cls.objects.select_for_update(skip_locked=True)
+                    .only('id', 'current_stock')
+                    .filter(pk=product_id)
+                    .first()
+                )
+                if product is None:
+                    if not cls.objects.filter(pk=product_id).exists():
+                        raise cls.DoesNotExist
+                    raise StockBusy
+                if product.current_stock + quantity < 0:
+                    raise InsufficientStock
+                product.current_stock += quantity
+                product.save(update_fields=['current_stock'])
+                stock = product.current_stock
+            else:
+                if not cls.objects.filter(pk=product_id).update(current_stock=F('current_stock') + quantity):
+                    raise cls.DoesNotExist
+                # Our UPDATE holds the row lock, so this reads our own write
+                stock = cls.objects.filter(pk=product_id).values_list('current_stock', flat=True).get()
+                # save() above goes through the post_save signal; update() doesn't
+                cls.refresh_low_stock(product_ids=[product_id])
+            StockHistory.objects.create(product_id=product_id, change_type=change_type, quantity=quantity)
+        return stock
+
 class StockHistory(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_history")
     change_type = models.CharField(max_length=50)  # purchase, sale, return, manual_update
     quantity = models.IntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'timestamp'], name='pm_stock_history_product_idx'),
+        ]
+
+
+class StockHistoryDaily(models.Model):
+    """
+    Movements older than the retention window, compacted to one row per
+    product, UTC day and change type. Raw StockHistory rows are deleted as
+    they are rolled in, so the two tables never overlap.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_history_daily")
+    day = models.DateField()
+    change_type = models.CharField(max_length=50)
+    quantity = models.IntegerField(default=0)
+    movements = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day', 'change_type'], name='pm_stock_daily_uniq'),
+        ]
+
+    @classmethod
+    def compact(cls, before):
+        """
+        Move raw movements dated before the `before` day into daily rows, one
+        day per transaction. Returns the number of raw rows compacted.
+        """
+        oldest = StockHistory.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+        if oldest is None:
+            return 0
+        history = connection.ops.quote_name(StockHistory._meta.db_table)
+        daily = connection.ops.quote_name(cls._meta.db_table)
+        # DELETE ... RETURNING feeds the upsert, so a row is either raw or compacted, never both
+        sql = (
+            f"WITH moved AS ("
+            f"DELETE FROM {history} WHERE timestamp >= %s AND timestamp < %s "
+            f"RETURNING product_id, change_type, quantity"
+            f"), rolled AS ("
+            f"INSERT INTO {daily} AS d (product_id, day, change_type, quantity, movements) "
+            f"SELECT product_id, %s, change_type, SUM(quantity), COUNT(*) FROM moved GROUP BY product_id, change_type "
+            f"ON CONFLICT (product_id, day, change_type) DO UPDATE SET "
+            f"quantity = d.quantity + EXCLUDED.quantity, movements = d.movements + EXCLUDED.movements"
+            f") SELECT COUNT(*) FROM moved"
+        )
+        compacted = 0
+        day = oldest.astimezone(dt_timezone.utc).date()
+        while day < before:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [day_start(day), day_start(day + timedelta(days=1)), day])
+                compacted += cursor.fetchone()[0]
+            day += timedelta(days=1)
+        return compacted
+
+
+class StockSnapshot(models.Model):
+    """
+    A product's stock level at the start of a UTC day, so stock at a past time
+    is one checkpoint plus the movements since, not a sum over all history.
+    Checkpoints sit on day boundaries so they line up with StockHistoryDaily.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_snapshots")
+    taken_at = models.DateTimeField()
+    stock = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='pm_stock_snapshot_uniq'),
+        ]
+
+    @classmethod
+    def take(cls, day, batch_size=2000):
+        """
+        Checkpoint, at the start of `day`, every product that has moved since
+        its latest checkpoint, working back from current_stock through the raw
+        movements since. A product that hasn't moved needs no new checkpoint:
+        its latest one (or current_stock, without one) is still exact. `day`
+        should be newer than the compaction horizon. Returns the number written.
+        """
+        at = day_start(day)
+        later = (
+            StockHistory.objects.filter(product=OuterRef('pk'), timestamp__gt=at)
+            .order_by().values('product').annotate(total=Sum('quantity')).values('total')
+        )
+        latest = cls.objects.filter(product=OuterRef('pk')).order_by('-taken_at').values('taken_at')[:1]
+        products = (
+            Product.objects.filter(created_at__lte=at)
+            .annotate(since=Coalesce(Subquery(latest), Value(day_start(datetime.min.date()))))
+            .annotate(since_day=TruncDate('since', tzinfo=dt_timezone.utc))
+            .filter(
+                Exists(StockHistory.objects.filter(
+                    product=OuterRef('pk'), timestamp__gt=OuterRef('since'), timestamp__lte=at,
+                ))
+                | Exists(StockHistoryDaily.objects.filter(
+                    product=OuterRef('pk'), day__gte=OuterRef('since_day'), day__lt=day,
+                ))
+            )
+            .annotate(stock_then=F('current_stock') - Coalesce(Subquery(later), 0))
+            .values_list('pk', 'stock_then')
+        )
+        written = 0
+        batch = []
+        for product_id, stock in products.iterator(chunk_size=batch_size):
+            batch.append(cls(product_id=product_id, taken_at=at, stock=stock))
+            if len(batch) >= batch_size:
+                written += len(cls.objects.bulk_create(batch, ignore_conflicts=True))
+                batch = []
+        written += len(cls.objects.bulk_create(batch, ignore_conflicts=True))
+        return written
+
+    @classmethod
+    def prune(cls, before):
+        """
+        Delete checkpoints taken before the `before` day, except each
+        product's newest one, which stock_at still needs. Returns the count.
+        """
+        newer = cls.objects.filter(product=OuterRef('product'), taken_at__gt=OuterRef('taken_at'))
+        deleted, _ = cls.objects.filter(taken_at__lt=day_start(before)).filter(Exists(newer)).delete()
+        return deleted
+
+    @classmethod
+    def stock_at(cls, product, at):
+        """
+        Stock of `product` at `at`: the latest checkpoint before it plus the
+        movements since, or current_stock minus the movements after it when
+        there is no checkpoint. Inside a compacted day the result is the
+        stock at the start of that day. None if the product didn't exist yet.
+        """
+        if at < product.created_at:
+            return None
+        at_day = at.astimezone(dt_timezone.utc).date()
+        raw = StockHistory.objects.filter(product=product)
+        daily = StockHistoryDaily.objects.filter(product=product)
+        snapshot = cls.objects.filter(product=product, taken_at__lte=at).order_by('-taken_at').first()
+
+        if snapshot is None:
+            # Work back from now; a partly elapsed compacted day counts as after `at`
+            after = raw.filter(timestamp__gt=at).aggregate(total=Sum('quantity'))['total'] or 0
+            after += daily.filter(day__gte=at_day).aggregate(total=Sum('quantity'))['total'] or 0
+            return product.current_stock - after
+
+        # Compacted days count once they have fully elapsed by `at`
+        first_day = snapshot.taken_at.astimezone(dt_timezone.utc).date()
+        since = raw.filter(timestamp__gt=snapshot.taken_at, timestamp__lte=at).aggregate(total=Sum('quantity'))['total'] or 0
+        since += daily.filter(day__gte=first_day, day__lt=at_day).aggregate(total=Sum('quantity'))['total'] or 0
+        return snapshot.stock + since
+
 class PriceHistory(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="price_history")
     old_price = models.DecimalField(max_digits=10, decimal_places=2)
     new_price = models.DecimalField(max_digits=10, decimal_places=2)
     changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'changed_at'], name='pm_price_history_product_idx'),
+        ]
+
+    @classmethod
+    def record(cls, changes):
+        """Bulk-insert a row per (product_id, old_price, new_price) where the price actually moved."""
+        rows = [
+            cls(product_id=product_id, old_price=old_price, new_price=new_price)
+            for product_id, old_price, new_price in changes
+            if old_price != new_price
+        ]
+        return cls.objects.bulk_create(rows, batch_size=1000)
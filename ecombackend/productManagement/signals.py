@@ -0,0 +1,49 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Category, Product, PriceHistory
+
+
+@receiver(pre_save, sender=Product)
+def remember_price(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._price_before = None
+    if raw or instance.pk is None or (update_fields is not None and 'price' not in update_fields):
+        return
+    instance._price_before = (
+        Product.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def record_price_change(sender, instance, created=False, **kwargs):
+    old_price = getattr(instance, '_price_before', None)
+    if not created and old_price is not None:
+        PriceHistory.record([(instance.pk, old_price, instance.price)])
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_low_stock(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or {'current_stock', 'category'} & set(update_fields):
+        Product.refresh_low_stock(product_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_low_stock(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        Product.refresh_low_stock(category_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    # SET_NULL runs as a plain UPDATE, so note who falls back to the default threshold
+    instance._low_stock_products = list(instance.product_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def refresh_uncategorized_low_stock(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_low_stock_products', None)
+    if product_ids:
+        Product.refresh_low_stock(product_ids=product_ids)
@@ -0,0 +1,121 @@
+"""
+Bulk stock movements for warehouse syncs.
+
+Rows of (sku, quantity, change_type) are applied in chunks. Each chunk locks
+its products in id order, then runs one UPDATE ... FROM (VALUES ...) statement
+plus one bulk insert of StockHistory, in a single transaction. Every input row
+gets its own outcome.
+"""
+import csv
+import io
+
+from django.db import connection, transaction
+
+from .models import Product, StockHistory
+
+DEFAULT_CHANGE_TYPE = 'manual_update'
+# Bounds of the integer current_stock column
+STOCK_MIN = -2**31
+STOCK_MAX = 2**31 - 1
+
+
+def read_csv_rows(uploaded_file):
+    """Yield dict rows from an uploaded CSV with a sku,quantity[,change_type] header."""
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+
+def clean_row(row):
+    """Return (sku, quantity, change_type) or raise ValueError with a message."""
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    sku = str(row.get('sku') or '').strip()
+    if not sku:
+        raise ValueError("sku is required")
+    quantity = row.get('quantity', row.get('delta'))
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError("quantity must be an integer")
+    if not STOCK_MIN <= quantity <= STOCK_MAX:
+        raise ValueError("quantity is out of range")
+    change_type = str(row.get('change_type') or DEFAULT_CHANGE_TYPE).strip()[:50]
+    return sku, quantity, change_type
+
+
+def apply_movements(rows, chunk_size=1000):
+    """
+    Apply stock movements and return one outcome dict per input row, in order:
+    {'row', 'sku', 'status': 'applied' | 'not_found' | 'invalid', ...}.
+    """
+    results = []
+    chunk = []
+    for index, row in enumerate(rows, start=1):
+        try:
+            sku, quantity, change_type = clean_row(row)
+        except ValueError as exc:
+            results.append({'row': index, 'sku': row.get('sku') if isinstance(row, dict) else None,
+                            'status': 'invalid', 'error': str(exc)})
+            continue
+        outcome = {'row': index, 'sku': sku, 'quantity': quantity}
+        results.append(outcome)
+        chunk.append((outcome, change_type))
+        if len(chunk) >= chunk_size:
+            apply_chunk(chunk)
+            chunk = []
+    if chunk:
+        apply_chunk(chunk)
+    return results
+
+
+def apply_chunk(chunk):
+    """Apply one chunk of (outcome, change_type) pairs, filling in each outcome."""
+    # UPDATE ... FROM only applies one source row per target, so sum repeats first
+    deltas = {}
+    for outcome, _ in chunk:
+        deltas[outcome['sku']] = deltas.get(outcome['sku'], 0) + outcome['quantity']
+
+    table = connection.ops.quote_name(Product._meta.db_table)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Lock in id order first: concurrent chunks touching the same
+            # products then queue up instead of deadlocking on each other
+            cursor.execute(
+                f"SELECT sku, current_stock FROM {table} WHERE sku = ANY(%s) ORDER BY id FOR UPDATE",
+                [list(deltas)],
+            )
+            locked = dict(cursor.fetchall())
+            # The rows are locked, so the totals checked here are the ones written
+            overflowing = {sku for sku, stock in locked.items() if not STOCK_MIN <= stock + deltas[sku] <= STOCK_MAX}
+            deltas = {sku: delta for sku, delta in deltas.items() if sku in locked and sku not in overflowing}
+
+            updated = {}
+            if deltas:
+                values = ', '.join(['(%s, %s::bigint)'] * len(deltas))
+                cursor.execute(
+                    f"UPDATE {table} AS p SET current_stock = p.current_stock + v.delta "
+                    f"FROM (VALUES {values}) AS v(sku, delta) "
+                    f"WHERE p.sku = v.sku RETURNING p.sku, p.id, p.current_stock",
+                    [value for item in deltas.items() for value in item],
+                )
+                updated = {sku: (product_id, stock) for sku, product_id, stock in cursor.fetchall()}
+
+        history = []
+        for outcome, change_type in chunk:
+            if outcome['sku'] in overflowing:
+                outcome['status'] = 'invalid'
+                outcome['error'] = "stock would be out of range"
+                continue
+            if outcome['sku'] not in updated:
+                outcome['status'] = 'not_found'
+                continue
+            product_id, stock = updated[outcome['sku']]
+            outcome['status'] = 'applied'
+            outcome['current_stock'] = stock
+            history.append(StockHistory(product_id=product_id, change_type=change_type, quantity=outcome['quantity']))
+        StockHistory.objects.bulk_create(history, batch_size=1000)
+        Product.refresh_low_stock(product_ids=[product_id for product_id, _ in updated.values()])
@@ -1,3 +1,95 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from ecombackend.pagination import KeysetCursorPagination, ordering_names
+from .models import Product, StockHistory
+
+
+class KeysetPaginationTests(APITestCase):
+    """Pages through a product's stock history, which is ordered by -timestamp."""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='clerk', password='pass'))
+        self.product = Product.objects.create(name='Widget', sku='W-1', price=1)
+        self.url = f'/api/products/{self.product.pk}/history/'
+
+    def create_movements(self, count, timestamp=None):
+        StockHistory.objects.bulk_create([
+            StockHistory(product=self.product, change_type='purchase', quantity=i) for i in range(count)
+        ])
+        if timestamp is not None:
+            StockHistory.objects.update(timestamp=timestamp)
+
+    def walk(self, url):
+        """Follow `next` links from `url`; returns (pages of ids, last response body)."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append([row['id'] for row in response.data['results']])
+            body, url = response.data, response.data['next']
+        return pages, body
+
+    def test_ties_on_the_ordering_column_are_neither_skipped_nor_repeated(self):
+        self.create_movements(25, timestamp=timezone.now())
+        pages, _ = self.walk(f'{self.url}?page_size=4')
+        ids = [row_id for page in pages for row_id in page]
+        expected = list(StockHistory.objects.order_by('-timestamp', '-pk').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 7)
+
+    def test_previous_pages_mirror_next_pages(self):
+        now = timezone.now()
+        self.create_movements(10, timestamp=now)
+        # A second timestamp, so the cursor spans both columns
+        StockHistory.objects.filter(pk__in=StockHistory.objects.order_by('pk').values('pk')[:5]).update(
+            timestamp=now - timedelta(hours=1)
+        )
+        forward, body = self.walk(f'{self.url}?page_size=3')
+        backward = []
+        url = body['previous']
+        while url:
+            response = self.client.get(url)
+            backward.insert(0, [row['id'] for row in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(backward, forward[:-1])
+
+    def test_orderings_that_cannot_be_read_off_a_row_fall_back(self):
+        queryset = Product.objects.all()
+        self.assertIsNone(ordering_names([Lower('name')], queryset))
+        self.assertIsNone(ordering_names([F('created_at').desc(nulls_last=True)], queryset))
+        self.assertIsNone(ordering_names(['category__name'], queryset))
+        self.assertIsNone(ordering_names(['?'], queryset))
+        self.assertEqual(ordering_names([F('created_at').desc(), 'name'], queryset), ['-created_at', 'name'])
+
+        ordering = KeysetCursorPagination().get_ordering(None, queryset.order_by(Lower('name')), None)
+        self.assertEqual(ordering, ('-pk',))
+
+    def test_expression_ordering_still_pages_every_row(self):
+        Product.objects.bulk_create([Product(name=f'Product {i}', sku=f'SKU-{i}', price=1) for i in range(6)])
+        paginator = KeysetCursorPagination()
+        factory = APIRequestFactory()
+        queryset = Product.objects.order_by(Lower('name'))
+        ids, url = [], '/?page_size=3'
+        while url:
+            page = paginator.paginate_queryset(queryset, Request(factory.get(url)))
+            ids += [product.pk for product in page]
+            url = paginator.get_next_link()
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), Product.objects.count())
+
+    def test_stream_returns_every_row_as_json_lines(self):
+        self.create_movements(5)
+        response = self.client.get(f'{self.url}?stream=1&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        expected = list(StockHistory.objects.order_by('-timestamp').values_list('pk', flat=True))
+        self.assertEqual([row['id'] for row in rows], expected)
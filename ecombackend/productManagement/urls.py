@@ -1,11 +1,15 @@
 from django.urls import path
-from .views import ProductListAPI, ProductDetailAPI, AddProductAPI, UpdateStockAPI, StockHistoryAPI, LowStockAPI
+from .views import ProductListAPI, ProductDetailAPI, AddProductAPI, UpdateStockAPI, StockHistoryAPI, LowStockAPI, BulkStockAPI, ImportCatalogAPI, EffectivePriceAPI, StockAtAPI
 
 urlpatterns = [
     path('products/', ProductListAPI.as_view()),
     path('products/<int:pk>/', ProductDetailAPI.as_view()),
     path('products/add/', AddProductAPI.as_view()),
+    path('catalog/import/', ImportCatalogAPI.as_view()),
+    path('prices/effective/', EffectivePriceAPI.as_view()),
     path('products/<int:pk>/stock/', UpdateStockAPI.as_view()),
+    path('products/stock/bulk/', BulkStockAPI.as_view()),
     path('products/<int:pk>/history/', StockHistoryAPI.as_view()),
+    path('products/<int:pk>/stock-at/', StockAtAPI.as_view()),
     path('products/low-stock/', LowStockAPI.as_view()),
 ]
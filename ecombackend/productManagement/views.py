@@ -1,16 +1,26 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Product, StockHistory
+from .models import Product, StockHistory, StockSnapshot, StockBusy, InsufficientStock
 from .serializers import ProductSerializer, StockHistorySerializer
+from .catalog import FORMATS, CatalogImporter, detect_format, read_rows
+from .stock import apply_movements, read_csv_rows
+from ecombackend.pagination import list_response
+from users.permissions import IsEmployee
 
 # List all products
 class ProductListAPI(APIView):
     def get(self, request):
-        products = Product.objects.all()
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        products = Product.objects.order_by('-created_at')
+        return list_response(request, products, ProductSerializer, view=self)
 
 # Get product detail
 class ProductDetailAPI(APIView):
@@ -28,35 +38,141 @@ class AddProductAPI(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# Import a catalog file (CSV or NDJSON), upserting products by sku
+class ImportCatalogAPI(APIView):
+    permission_classes = [IsEmployee]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get("format") or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({"error": f"format must be one of {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = CatalogImporter(batch_size=getattr(settings, 'CATALOG_IMPORT_BATCH_SIZE', 1000))
+        return Response(importer.run(read_rows(upload, file_format)))
+
 # Update stock
 class UpdateStockAPI(APIView):
     def post(self, request, pk):
-        product = Product.objects.get(id=pk)
-        qty = int(request.data.get("quantity", 0))
+        try:
+            qty = int(request.data.get("quantity", 0))
+        except (TypeError, ValueError):
+            return Response({"error": "quantity must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
         change_type = request.data.get("change_type", "manual_update")
-        
-        product.current_stock += qty
-        product.save()
-
-        StockHistory.objects.create(
-            product=product,
-            change_type=change_type,
-            quantity=qty
-        )
-        return Response({"message": "Stock updated successfully"})
-
-# Get stock history
+        # "reserve" locks the row and refuses to oversell instead of blindly adding
+        reserve = request.data.get("mode") == "reserve"
+
+        try:
+            stock = Product.adjust_stock(pk, qty, change_type, reserve=reserve)
+        except Product.DoesNotExist:
+            return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        except StockBusy:
+            return Response({"error": "Product stock is being updated, retry"}, status=status.HTTP_409_CONFLICT)
+        except InsufficientStock:
+            return Response({"error": "Insufficient stock"}, status=status.HTTP_409_CONFLICT)
+        return Response({"message": "Stock updated successfully", "current_stock": stock})
+
+# Bulk stock movements (JSON list or CSV upload)
+class BulkStockAPI(APIView):
+    permission_classes = [IsEmployee]
+    parser_classes = [JSONParser, MultiPartParser]
+
+    def post(self, request):
+        max_rows = getattr(settings, 'STOCK_BULK_MAX_ROWS', 100000)
+        upload = request.FILES.get("file")
+        if upload is not None:
+            rows = read_csv_rows(upload)
+        else:
+            rows = request.data.get("movements") if isinstance(request.data, dict) else request.data
+            if not isinstance(rows, list):
+                return Response({"error": "Send a list of movements or a CSV file"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = list(islice(rows, max_rows + 1))
+        if len(rows) > max_rows:
+            return Response({"error": f"At most {max_rows} rows per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_movements(rows, chunk_size=getattr(settings, 'STOCK_BULK_CHUNK_SIZE', 1000))
+        applied = sum(1 for result in results if result['status'] == 'applied')
+        return Response({
+            "processed": len(results),
+            "applied": applied,
+            "failed": len(results) - applied,
+            "results": results,
+        })
+
+# Effective prices of many products at one point in time
+class EffectivePriceAPI(APIView):
+    permission_classes = [IsEmployee]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Send an object with at and product_ids or skus"}, status=status.HTTP_400_BAD_REQUEST)
+        at = parse_datetime(str(request.data.get("at", "")))
+        if at is None:
+            return Response({"error": "at must be an ISO 8601 datetime"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+        product_ids = request.data.get("product_ids") or []
+        skus = request.data.get("skus") or []
+        if not isinstance(product_ids, list) or not isinstance(skus, list) or not (product_ids or skus):
+            return Response({"error": "Send a list of product_ids or skus"}, status=status.HTTP_400_BAD_REQUEST)
+        max_products = getattr(settings, 'PRICE_LOOKUP_MAX_PRODUCTS', 10000)
+        if len(product_ids) + len(skus) > max_products:
+            return Response({"error": f"At most {max_products} products per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            products = Product.objects.filter(Q(pk__in=product_ids) | Q(sku__in=skus)).order_by()
+            prices = list(Product.prices_at(at, products).values('id', 'sku', 'effective_price'))
+        except (TypeError, ValueError):
+            return Response({"error": "product_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "at": at,
+            "prices": [
+                {
+                    "product_id": row['id'],
+                    "sku": row['sku'],
+                    # Decimal strings, as ProductSerializer renders prices
+                    "price": None if row['effective_price'] is None else str(row['effective_price']),
+                }
+                for row in prices
+            ],
+        })
+
+# Get stock history (recent raw movements; older ones are compacted into daily rows)
 class StockHistoryAPI(APIView):
     def get(self, request, pk):
-        product = Product.objects.get(id=pk)
-        history = product.stock_history.all()
-        serializer = StockHistorySerializer(history, many=True)
-        return Response(serializer.data)
+        history = StockHistory.objects.filter(product_id=pk).order_by('-timestamp')
+        return list_response(request, history, StockHistorySerializer, view=self)
+
+# Stock level of a product at a past time
+class StockAtAPI(APIView):
+    def get(self, request, pk):
+        at = parse_datetime(request.GET.get("at", ""))
+        if at is None:
+            return Response({"error": "at must be an ISO 8601 datetime"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        try:
+            product = Product.objects.get(id=pk)
+        except Product.DoesNotExist:
+            return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"product_id": product.id, "at": at, "stock": StockSnapshot.stock_at(product, at)})
 
 # Low stock alert
 class LowStockAPI(APIView):
     def get(self, request):
-        threshold = int(request.GET.get("threshold", 5))
-        low_stock_products = Product.objects.filter(current_stock__lte=threshold)
-        serializer = ProductSerializer(low_stock_products, many=True)
-        return Response(serializer.data)
+        if "threshold" in request.GET:
+            # Ad hoc threshold: filters current_stock directly instead of the maintained flag
+            try:
+                threshold = int(request.GET["threshold"])
+            except ValueError:
+                return Response({"error": "threshold must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            low_stock_products = Product.objects.filter(current_stock__lte=threshold)
+        else:
+            # Per-category thresholds, served from the partial index on is_low_stock
+            low_stock_products = Product.objects.filter(is_low_stock=True)
+        return list_response(request, low_stock_products.order_by('-created_at'), ProductSerializer, view=self)
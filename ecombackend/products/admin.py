@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ProductForm, Sales, Dashboard
+from .models import ProductForm, Sales, Dashboard, ProductSalesRollup, SalesDailyFact
 
 
 @admin.register(ProductForm)
@@ -38,3 +38,18 @@ class DashboardAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'user']
     search_fields = ['product_name', 'user__username']
     readonly_fields = ['dashboard_id', 'created_at', 'updated_at']
+
+
+@admin.register(ProductSalesRollup)
+class ProductSalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['product', 'total_amount', 'total_quantity', 'sales_count', 'last_sale_date', 'updated_at']
+    search_fields = ['product__product_name']
+    readonly_fields = ['product', 'total_amount', 'total_quantity', 'sales_count', 'last_sale_date', 'updated_at']
+
+
+@admin.register(SalesDailyFact)
+class SalesDailyFactAdmin(admin.ModelAdmin):
+    list_display = ['product', 'day', 'revenue', 'quantity', 'sales_count']
+    list_filter = ['day']
+    search_fields = ['product__product_name']
+    date_hierarchy = 'day'
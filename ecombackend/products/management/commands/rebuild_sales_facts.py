@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.models import ProductForm, SalesDailyFact
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild SalesDailyFact rows from the raw Sales table, in parallel chunks of products."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='product_ids',
+                            help='Only rebuild this product id (can be repeated)')
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Only backfill products that have no fact rows yet')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Products per chunk (default: 500)')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Chunks rebuilt concurrently, one DB connection each (default: 4)')
+
+    def handle(self, *args, **options):
+        products = ProductForm.objects.order_by('product_id')
+        if options['product_ids']:
+            products = products.filter(product_id__in=options['product_ids'])
+        if options['missing_only']:
+            products = products.filter(daily_sales__isnull=True)
+        product_ids = list(products.values_list('product_id', flat=True).distinct())
+
+        chunk_size = max(options['chunk_size'], 1)
+        chunks = [product_ids[i:i + chunk_size] for i in range(0, len(product_ids), chunk_size)]
+        self.stdout.write(f"Rebuilding facts for {len(product_ids)} products in {len(chunks)} chunks")
+
+        written = 0
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            futures = [executor.submit(self.rebuild_chunk, chunk) for chunk in chunks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                written += future.result()
+                self.stdout.write(f"  chunk {done}/{len(chunks)} done")
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} fact rows"))
+
+    @staticmethod
+    def rebuild_chunk(product_ids):
+        try:
+            return SalesDailyFact.rebuild_for_products(product_ids)
+        finally:
+            # Worker threads open their own connections; don't leak them
+            connection.close()
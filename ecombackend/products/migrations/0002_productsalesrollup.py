@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-18 10:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    ProductForm = apps.get_model('products', 'ProductForm')
+    Sales = apps.get_model('products', 'Sales')
+    ProductSalesRollup = apps.get_model('products', 'ProductSalesRollup')
+
+    totals = {
+        row['product_id']: row
+        for row in Sales.objects.order_by().values('product_id').annotate(
+            total_amount=models.Sum('sales_amount'),
+            total_quantity=models.Sum('quantity'),
+            sales_count=models.Count('sales_id'),
+            last_sale_date=models.Max('sale_date'),
+        )
+    }
+    rollups = []
+    for product_id in ProductForm.objects.values_list('product_id', flat=True).iterator():
+        row = totals.get(product_id, {})
+        rollups.append(ProductSalesRollup(
+            product_id=product_id,
+            total_amount=row.get('total_amount') or 0,
+            total_quantity=row.get('total_quantity') or 0,
+            sales_count=row.get('sales_count') or 0,
+            last_sale_date=row.get('last_sale_date'),
+        ))
+    ProductSalesRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesRollup',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_rollup', serialize=False, to='products.productform')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('last_sale_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
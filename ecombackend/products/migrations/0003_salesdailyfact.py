@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 11:02
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_facts(apps, schema_editor):
+    # The analytics endpoints read facts as soon as this is deployed
+    Sales = apps.get_model('products', 'Sales')
+    SalesDailyFact = apps.get_model('products', 'SalesDailyFact')
+
+    rows = (
+        Sales.objects.order_by()
+        .annotate(day=TruncDate('sale_date', tzinfo=datetime.timezone.utc))
+        .values('product_id', 'day')
+        .annotate(revenue=models.Sum('sales_amount'), quantity=models.Sum('quantity'), sales_count=models.Count('sales_id'))
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(SalesDailyFact(**row))
+        if len(batch) >= 1000:
+            SalesDailyFact.objects.bulk_create(batch)
+            batch = []
+    SalesDailyFact.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_productsalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.productform')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='products_sa_day_bd0a45_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='unique_sales_fact_product_day')],
+            },
+        ),
+        migrations.RunPython(backfill_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 12:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import products.models
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0004_submission_search_indexes'),
+        ('products', '0003_salesdailyfact'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='productform',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('product_name', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('product_type', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), '||', products.models.CustomFieldsDocument('custom_fields'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='productform',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_pr_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='productform',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['product_name'], name='products_pr_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,7 +1,28 @@
-from django.db import models
+from datetime import timezone as dt_timezone
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorCombinable, SearchVectorField
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+class CustomFieldsDocument(SearchVectorCombinable, models.Func):
+    """Weight-C tsvector over every string and number value in custom_fields."""
+    template = "setweight(jsonb_to_tsvector('simple'::regconfig, %(expressions)s, '[\"string\", \"numeric\"]'::jsonb), 'C')"
+    output_field = SearchVectorField()
+
+
+def product_search_document():
+    return (
+        SearchVector('product_name', weight='A', config='simple')
+        + SearchVector('product_type', weight='B', config='simple')
+        + CustomFieldsDocument('custom_fields')
+    )
+
+
 class ProductForm(models.Model):
     """
     Represents a product with form-based attributes.
@@ -36,6 +57,13 @@ class ProductForm(models.Model):
         blank=True,
         help_text='Custom product attributes from form builder'
     )
+
+    # Maintained by PostgreSQL from name, type and custom field values
+    search_vector = models.GeneratedField(
+        expression=product_search_document(),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     
     class Meta:
         ordering = ['-created_at']
@@ -43,6 +71,8 @@ class ProductForm(models.Model):
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['product_type']),
             models.Index(fields=['sellable']),
+            GinIndex(fields=['search_vector'], name='products_pr_search_gin'),
+            GinIndex(fields=['product_name'], opclasses=['gin_trgm_ops'], name='products_pr_name_trgm'),
         ]
     
     def __str__(self):
@@ -75,6 +105,164 @@ class Sales(models.Model):
         return f"Sale #{self.sales_id} - {self.product.product_name} - ${self.sales_amount}"
 
 
+class ProductSalesRollup(models.Model):
+    """
+    Running per-product sales totals, kept current from Sales writes
+    (see products.signals) so readers never have to scan the sales table.
+    Queryset .update()/.bulk_create() bypass signals; call rebuild() after those.
+    """
+    product = models.OneToOneField(
+        ProductForm,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sales_rollup'
+    )
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    sales_count = models.IntegerField(default=0)
+    last_sale_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rollup for product #{self.product_id}: {self.sales_count} sales"
+
+    @classmethod
+    def for_product(cls, product):
+        """Return the product's rollup, or an empty one if it has no sales yet."""
+        try:
+            return product.sales_rollup
+        except cls.DoesNotExist:
+            return cls(product=product)
+
+    @property
+    def average_sale(self):
+        if not self.sales_count:
+            return 0
+        return self.total_amount / self.sales_count
+
+    @classmethod
+    def apply_delta(cls, product_id, amount, quantity, count, sale_date=None, create=True):
+        """Atomically add a delta to one product's rollup row."""
+        with transaction.atomic():
+            if create:
+                cls.objects.bulk_create([cls(product_id=product_id)], ignore_conflicts=True)
+            updates = {
+                'total_amount': F('total_amount') + amount,
+                'total_quantity': F('total_quantity') + quantity,
+                'sales_count': F('sales_count') + count,
+            }
+            if sale_date is not None:
+                updates['last_sale_date'] = Greatest(
+                    Coalesce('last_sale_date', Value(sale_date)), Value(sale_date)
+                )
+            cls.objects.filter(product_id=product_id).update(**updates)
+
+    @classmethod
+    def refresh_last_sale_date(cls, product_id):
+        """Recompute last_sale_date from the (product, -sale_date) index."""
+        latest = Sales.objects.filter(product_id=product_id).aggregate(latest=Max('sale_date'))['latest']
+        cls.objects.filter(product_id=product_id).update(last_sale_date=latest)
+
+    @classmethod
+    def rebuild(cls, product_ids=None):
+        """Recompute rollups from the raw sales table."""
+        sales = Sales.objects.all()
+        products = ProductForm.objects.all()
+        if product_ids is not None:
+            sales = sales.filter(product_id__in=product_ids)
+            products = products.filter(product_id__in=product_ids)
+
+        totals = {
+            row['product_id']: row
+            for row in sales.order_by().values('product_id').annotate(
+                total_amount=Sum('sales_amount'),
+                total_quantity=Sum('quantity'),
+                sales_count=Count('sales_id'),
+                last_sale_date=Max('sale_date'),
+            )
+        }
+        rollups = []
+        for product_id in products.values_list('product_id', flat=True).iterator():
+            row = totals.get(product_id, {})
+            rollups.append(cls(
+                product_id=product_id,
+                total_amount=row.get('total_amount') or 0,
+                total_quantity=row.get('total_quantity') or 0,
+                sales_count=row.get('sales_count') or 0,
+                last_sale_date=row.get('last_sale_date'),
+            ))
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                rollups,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['total_amount', 'total_quantity', 'sales_count', 'last_sale_date', 'updated_at'],
+            )
+        return len(rollups)
+
+
+class SalesDailyFact(models.Model):
+    """
+    Sales totals per product per day (UTC), kept current from Sales writes
+    (see products.signals). Rebuild with the rebuild_sales_facts command.
+    """
+    product = models.ForeignKey(
+        ProductForm,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantity = models.BigIntegerField(default=0)
+    sales_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_sales_fact_product_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"Product #{self.product_id} on {self.day}: {self.sales_count} sales"
+
+    @staticmethod
+    def day_for(sale_date):
+        return timezone.localdate(sale_date, dt_timezone.utc)
+
+    @classmethod
+    def apply_delta(cls, product_id, sale_date, amount, quantity, count, create=True):
+        """Atomically add a delta to the fact row for the sale's day."""
+        day = cls.day_for(sale_date)
+        with transaction.atomic():
+            if create:
+                cls.objects.bulk_create([cls(product_id=product_id, day=day)], ignore_conflicts=True)
+            cls.objects.filter(product_id=product_id, day=day).update(
+                revenue=F('revenue') + amount,
+                quantity=F('quantity') + quantity,
+                sales_count=F('sales_count') + count,
+            )
+
+    @classmethod
+    def rebuild_for_products(cls, product_ids):
+        """Replace the facts of the given products with totals from the raw sales table."""
+        rows = (
+            Sales.objects.filter(product_id__in=product_ids)
+            .order_by()
+            .annotate(day=TruncDate('sale_date', tzinfo=dt_timezone.utc))
+            .values('product_id', 'day')
+            .annotate(revenue=Sum('sales_amount'), quantity=Sum('quantity'), sales_count=Count('sales_id'))
+        )
+        facts = [cls(**row) for row in rows.iterator(chunk_size=2000)]
+        with transaction.atomic():
+            cls.objects.filter(product_id__in=product_ids).delete()
+            cls.objects.bulk_create(facts, batch_size=1000)
+        return len(facts)
+
+
 class Dashboard(models.Model):
     """
     User dashboards for viewing and analyzing products and sales.
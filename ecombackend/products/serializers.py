@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ProductForm, Sales, Dashboard
+from .models import ProductForm, Sales, Dashboard, ProductSalesRollup
 from forms_app.serializers import FormSchemaSerializer
 
 
@@ -7,7 +7,9 @@ class ProductFormSerializer(serializers.ModelSerializer):
     user_username = serializers.CharField(source='user.username', read_only=True)
     form_schema_details = FormSchemaSerializer(source='form_schema', read_only=True)
     total_sales = serializers.SerializerMethodField()
-    sales_count = serializers.IntegerField(source='sales.count', read_only=True)
+    sales_count = serializers.SerializerMethodField()
+    total_quantity = serializers.SerializerMethodField()
+    last_sale_date = serializers.SerializerMethodField()
     
     class Meta:
         model = ProductForm
@@ -15,13 +17,24 @@ class ProductFormSerializer(serializers.ModelSerializer):
             'product_id', 'product_name', 'product_type', 'sellable',
             'created_at', 'image_path', 'user', 'user_username',
             'form_schema', 'form_schema_details', 'custom_fields',
-            'total_sales', 'sales_count'
+            'total_sales', 'sales_count', 'total_quantity', 'last_sale_date'
         ]
         read_only_fields = ['product_id', 'created_at', 'user']  # user is read-only now
     
     def get_total_sales(self, obj):
-        return sum(sale.sales_amount for sale in obj.sales.all())
+        return ProductSalesRollup.for_product(obj).total_amount
 
+    def get_sales_count(self, obj):
+        return ProductSalesRollup.for_product(obj).sales_count
+
+    def get_total_quantity(self, obj):
+        return ProductSalesRollup.for_product(obj).total_quantity
+
+    def get_last_sale_date(self, obj):
+        last_sale_date = ProductSalesRollup.for_product(obj).last_sale_date
+        if last_sale_date is None:
+            return None
+        return serializers.DateTimeField().to_representation(last_sale_date)
 
 
 class SalesSerializer(serializers.ModelSerializer):
@@ -0,0 +1,76 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ProductForm, Sales, ProductSalesRollup, SalesDailyFact
+
+
+@receiver(pre_save, sender=Sales)
+def remember_previous_sale(sender, instance, **kwargs):
+    """Keep the stored values of an edited sale so rollups and daily facts can be corrected."""
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = (
+            Sales.objects.filter(pk=instance.pk)
+            .values('product_id', 'sales_amount', 'quantity', 'sale_date')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Sales)
+def add_sale_to_rollups(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        ProductSalesRollup.apply_delta(
+            previous['product_id'],
+            -previous['sales_amount'],
+            -previous['quantity'],
+            -1,
+            create=False,
+        )
+        if previous['product_id'] != instance.product_id:
+            ProductSalesRollup.refresh_last_sale_date(previous['product_id'])
+        SalesDailyFact.apply_delta(
+            previous['product_id'],
+            previous['sale_date'],
+            -previous['sales_amount'],
+            -previous['quantity'],
+            -1,
+            create=False,
+        )
+    ProductSalesRollup.apply_delta(
+        instance.product_id,
+        instance.sales_amount,
+        instance.quantity,
+        1,
+        sale_date=instance.sale_date,
+    )
+    SalesDailyFact.apply_delta(
+        instance.product_id,
+        instance.sale_date,
+        instance.sales_amount,
+        instance.quantity,
+        1,
+    )
+
+
+@receiver(post_delete, sender=Sales)
+def remove_sale_from_rollups(sender, instance, origin=None, **kwargs):
+    # Rollup and fact rows go away with their product, nothing to adjust
+    if isinstance(origin, ProductForm):
+        return
+    ProductSalesRollup.apply_delta(
+        instance.product_id,
+        -instance.sales_amount,
+        -instance.quantity,
+        -1,
+        create=False,
+    )
+    ProductSalesRollup.refresh_last_sale_date(instance.product_id)
+    SalesDailyFact.apply_delta(
+        instance.product_id,
+        instance.sale_date,
+        -instance.sales_amount,
+        -instance.quantity,
+        -1,
+        create=False,
+    )
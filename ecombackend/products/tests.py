@@ -1,3 +1,113 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from forms_app.models import FormSchema, FormSubmission
+from .models import ProductForm, Sales, Dashboard
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Asserts that an endpoint runs a fixed number of queries no matter how
+    many rows it returns: call assertQueryBudget(url, budget, grow) where
+    grow(n) adds n more rows to the response.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.client.force_authenticate(self.user)
+        self.form_schema = FormSchema.objects.create(
+            title='Specs', created_by=self.user, language_config={'primary': 'en'}
+        )
+        FormSubmission.objects.create(form_schema=self.form_schema, data={'color': 'red'})
+
+    def create_product(self, name='Widget'):
+        product = ProductForm.objects.create(
+            product_name=name, product_type='gadget', user=self.user, form_schema=self.form_schema
+        )
+        Sales.objects.create(product=product, sales_amount=Decimal('9.99'), quantity=2)
+        return product
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, url, budget, grow):
+        grow(1)
+        few = self.count_queries(url)
+        grow(20)
+        many = self.count_queries(url)
+        self.assertEqual(few, many, f"{url} query count grows with rows ({few} -> {many})")
+        self.assertLessEqual(many, budget, f"{url} ran {many} queries, budget is {budget}")
+
+
+class ProductFormViewSetQueryTests(QueryBudgetTestCase):
+
+    def grow(self, n):
+        for i in range(n):
+            self.create_product(f'Widget {i}')
+
+    def test_list(self):
+        self.assertQueryBudget('/api/products/', 2, self.grow)
+
+    def test_by_type(self):
+        self.assertQueryBudget('/api/products/by_type/?type=gadget', 2, self.grow)
+
+    def test_sales_summary(self):
+        product = self.create_product()
+
+        def grow(n):
+            for _ in range(n):
+                Sales.objects.create(product=product, sales_amount=Decimal('1.00'), quantity=1)
+
+        self.assertQueryBudget(f'/api/products/{product.product_id}/sales_summary/', 3, grow)
+
+
+class SalesViewSetQueryTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product()
+
+    def grow(self, n):
+        for _ in range(n):
+            Sales.objects.create(product=self.product, sales_amount=Decimal('5.00'), quantity=1)
+
+    def test_list(self):
+        self.assertQueryBudget('/api/sales/', 1, self.grow)
+
+    def test_by_product(self):
+        self.assertQueryBudget(f'/api/sales/by_product/?product_id={self.product.product_id}', 1, self.grow)
+
+    def test_analytics(self):
+        self.assertQueryBudget('/api/sales/analytics/', 2, self.grow)
+
+
+class DashboardViewSetQueryTests(QueryBudgetTestCase):
+
+    def grow(self, n):
+        for i in range(n):
+            product = self.create_product(f'Widget {i}')
+            Dashboard.objects.create(
+                product=product, product_name=product.product_name, sales_table='sales', user=self.user
+            )
+
+    def test_list(self):
+        self.assertQueryBudget('/api/dashboards/', 2, self.grow)
+
+    def test_data(self):
+        product = self.create_product()
+        dashboard = Dashboard.objects.create(
+            product=product, product_name=product.product_name, sales_table='sales', user=self.user
+        )
+
+        def grow(n):
+            for _ in range(n):
+                Sales.objects.create(product=product, sales_amount=Decimal('1.00'), quantity=1)
+
+        self.assertQueryBudget(f'/api/dashboards/{dashboard.dashboard_id}/data/', 4, grow)
@@ -1,22 +1,98 @@
+from datetime import datetime, time, timedelta
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Prefetch
+from django.db.models.functions import TruncHour, TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from users.permissions import IsSuperEmployee  # Assuming you have this
+from forms_app.models import FormSchema
+from ecombackend.pagination import list_response
 
-from .models import ProductForm, Sales, Dashboard
+from .models import ProductForm, Sales, Dashboard, ProductSalesRollup, SalesDailyFact
 from .serializers import ProductFormSerializer, SalesSerializer, DashboardSerializer
 
 User = get_user_model()
 
+ANALYTICS_BUCKETS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+ANALYTICS_TOP_PRODUCTS = 20
+ANALYTICS_MAX_TOP_PRODUCTS = 100
+# Actions whose responses go through the ViewSet's serializer
+SERIALIZING_ACTIONS = ('list', 'retrieve', 'update', 'partial_update')
+DAILY_SERIES_DAYS = 30
+DAILY_SERIES_MAX_DAYS = 366
+
+
+def form_schema_prefetch(lookup):
+    """Prefetch form schemas with what FormSchemaSerializer reads, in one query."""
+    return Prefetch(
+        lookup,
+        queryset=FormSchema.objects.select_related('created_by').annotate(submission_count=Count('submissions'))
+    )
+
+
+def daily_sales_series(product, request):
+    """Last ?days= (default 30) daily totals for a product, read from the fact table."""
+    try:
+        days = int(request.query_params.get('days', DAILY_SERIES_DAYS))
+    except ValueError:
+        days = DAILY_SERIES_DAYS
+    days = max(1, min(days, DAILY_SERIES_MAX_DAYS))
+    since = SalesDailyFact.day_for(timezone.now()) - timedelta(days=days - 1)
+    return list(
+        SalesDailyFact.objects.filter(product=product, day__gte=since)
+        .order_by('day')
+        .values('day', 'revenue', 'quantity', 'sales_count')
+    )
+
+
+def parse_range_bound(value):
+    """Parse a ?from= / ?to= value: a date for whole days, otherwise an aware datetime."""
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is not None:
+        return day
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_sale_date_range(queryset, date_from, date_to):
+    """Filter raw sales by range bounds, keeping the sale_date column sargable."""
+    if date_from is not None:
+        if not isinstance(date_from, datetime):
+            date_from = timezone.make_aware(datetime.combine(date_from, time.min))
+        queryset = queryset.filter(sale_date__gte=date_from)
+    if date_to is not None:
+        if isinstance(date_to, datetime):
+            queryset = queryset.filter(sale_date__lte=date_to)
+        else:
+            queryset = queryset.filter(
+                sale_date__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+            )
+    return queryset
+
 
 class ProductFormViewSet(viewsets.ModelViewSet):
-    queryset = ProductForm.objects.all()
+    # search_vector is only for productsearch's WHERE clauses; never ship it back
+    queryset = ProductForm.objects.defer('search_vector')
     serializer_class = ProductFormSerializer
     lookup_field = 'product_id'
+    # Numeric only, so productManagement's products/low-stock/ etc. aren't swallowed
+    lookup_value_regex = r'\d+'
 
     permission_classes = [IsAuthenticated]
 
@@ -31,8 +107,18 @@ class ProductFormViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return ProductForm.objects.filter(user=self.request.user)
-        return ProductForm.objects.all()
+            queryset = ProductForm.objects.filter(user=self.request.user)
+        else:
+            queryset = ProductForm.objects.all()
+        queryset = queryset.defer('search_vector')
+
+        if self.action in SERIALIZING_ACTIONS + ('by_type',):
+            return queryset.select_related('user', 'sales_rollup').prefetch_related(
+                form_schema_prefetch('form_schema')
+            )
+        if self.action == 'sales_summary':
+            return queryset.select_related('sales_rollup')
+        return queryset
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -47,13 +133,17 @@ class ProductFormViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def sales_summary(self, request, product_id=None):
         product = self.get_object()
-        sales = product.sales.all()
+        rollup = ProductSalesRollup.for_product(product)
         summary = {
-            'total_sales': sales.aggregate(total=Sum('sales_amount'))['total'] or 0,
-            'total_quantity': sales.aggregate(total=Sum('quantity'))['total'] or 0,
-            'sales_count': sales.count(),
-            'average_sale': sales.aggregate(avg=Avg('sales_amount'))['avg'] or 0,
-            'recent_sales': SalesSerializer(sales[:5], many=True).data
+            'total_sales': rollup.total_amount,
+            'total_quantity': rollup.total_quantity,
+            'sales_count': rollup.sales_count,
+            'average_sale': rollup.average_sale,
+            'last_sale_date': rollup.last_sale_date,
+            'daily_sales': daily_sales_series(product, request),
+            'recent_sales': SalesSerializer(
+                product.sales.select_related('product').defer('product__search_vector')[:5], many=True
+            ).data
         }
         return Response(summary)
 
@@ -85,8 +175,13 @@ class SalesViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Sales.objects.filter(product__user=self.request.user)
-        return Sales.objects.all()
+            queryset = Sales.objects.filter(product__user=self.request.user)
+        else:
+            queryset = Sales.objects.all()
+
+        if self.action in SERIALIZING_ACTIONS + ('by_product',):
+            return queryset.select_related('product').defer('product__search_vector')
+        return queryset
 
     @action(detail=False, methods=['get'])
     def by_product(self, request):
@@ -94,20 +189,79 @@ class SalesViewSet(viewsets.ModelViewSet):
         if not product_id:
             return Response({'error': 'product_id parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
         sales = self.get_queryset().filter(product_id=product_id)
-        serializer = self.get_serializer(sales, many=True)
-        return Response(serializer.data)
+        return list_response(request, sales, self.get_serializer_class(), view=self,
+                             context=self.get_serializer_context())
+
+    def get_fact_queryset(self):
+        if self.request.user.is_authenticated:
+            return SalesDailyFact.objects.filter(product__user=self.request.user)
+        return SalesDailyFact.objects.all()
 
     @action(detail=False, methods=['get'])
     def analytics(self, request):
-        queryset = self.get_queryset()
+        try:
+            date_from = parse_range_bound(request.query_params.get('from'))
+            date_to = parse_range_bound(request.query_params.get('to'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        bucket = request.query_params.get('bucket')
+        if bucket and bucket not in ANALYTICS_BUCKETS:
+            return Response(
+                {'error': f"bucket must be one of: {', '.join(ANALYTICS_BUCKETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Whole-day questions are answered from the daily facts; only hourly
+        # buckets or sub-day ranges need the raw sales table.
+        use_facts = bucket != 'hour' and not any(
+            isinstance(bound, datetime) for bound in (date_from, date_to)
+        )
+        if use_facts:
+            queryset = self.get_fact_queryset()
+            if date_from is not None:
+                queryset = queryset.filter(day__gte=date_from)
+            if date_to is not None:
+                queryset = queryset.filter(day__lte=date_to)
+            date_field = 'day'
+            revenue, quantity, count = Sum('revenue'), Sum('quantity'), Sum('sales_count')
+        else:
+            queryset = filter_sale_date_range(self.get_queryset(), date_from, date_to)
+            date_field = 'sale_date'
+            revenue, quantity, count = Sum('sales_amount'), Sum('quantity'), Count('sales_id')
+
+        if bucket:
+            series = (
+                queryset.order_by()
+                .annotate(period=ANALYTICS_BUCKETS[bucket](date_field))
+                .values('period')
+                .annotate(revenue=revenue, quantity=quantity, count=count)
+                .order_by('period')
+            )
+            return Response({'bucket': bucket, 'series': list(series)})
+
+        try:
+            top = min(int(request.query_params.get('top', ANALYTICS_TOP_PRODUCTS)), ANALYTICS_MAX_TOP_PRODUCTS)
+        except ValueError:
+            return Response({'error': 'top must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        totals = queryset.order_by().aggregate(
+            total_revenue=revenue,
+            total_sales=count,
+            total_quantity=quantity,
+        )
+        total_revenue = totals['total_revenue'] or 0
+        total_sales = totals['total_sales'] or 0
         analytics = {
-            'total_revenue': queryset.aggregate(total=Sum('sales_amount'))['total'] or 0,
-            'total_sales': queryset.count(),
-            'total_quantity': queryset.aggregate(total=Sum('quantity'))['total'] or 0,
-            'average_sale': queryset.aggregate(avg=Avg('sales_amount'))['avg'] or 0,
-            'by_product': queryset.values('product__product_name').annotate(
-                total=Sum('sales_amount'),
-                count=Count('sales_id')
+            'total_revenue': total_revenue,
+            'total_sales': total_sales,
+            'total_quantity': totals['total_quantity'] or 0,
+            'average_sale': total_revenue / total_sales if total_sales else 0,
+            'by_product': list(
+                queryset.order_by()
+                .values('product_id', 'product__product_name')
+                .annotate(total=revenue, count=count)
+                .order_by('-total')[:max(top, 0)]
             )
         }
         return Response(analytics)
@@ -131,8 +285,15 @@ class DashboardViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Dashboard.objects.filter(user=self.request.user)
-        return Dashboard.objects.all()
+            queryset = Dashboard.objects.filter(user=self.request.user)
+        else:
+            queryset = Dashboard.objects.all()
+
+        if self.action in SERIALIZING_ACTIONS + ('data',):
+            return queryset.select_related('user', 'product__user', 'product__sales_rollup').defer(
+                'product__search_vector'
+            ).prefetch_related(form_schema_prefetch('product__form_schema'))
+        return queryset
 
     def perform_create(self, serializer):
         product = serializer.validated_data.get('product')
@@ -149,13 +310,17 @@ class DashboardViewSet(viewsets.ModelViewSet):
     def data(self, request, dashboard_id=None):
         dashboard = self.get_object()
         product = dashboard.product
+        rollup = ProductSalesRollup.for_product(product)
         data = {
             'dashboard': self.get_serializer(dashboard).data,
             'product': ProductFormSerializer(product).data,
             'sales_summary': {
-                'total_sales': product.sales.aggregate(total=Sum('sales_amount'))['total'] or 0,
-                'sales_count': product.sales.count(),
-                'recent_sales': SalesSerializer(product.sales.all()[:10], many=True).data
+                'total_sales': rollup.total_amount,
+                'sales_count': rollup.sales_count,
+                'daily_sales': daily_sales_series(product, request),
+                'recent_sales': SalesSerializer(
+                    product.sales.select_related('product').defer('product__search_vector')[:10], many=True
+                ).data
             }
         }
         return Response(data)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ProductsearchConfig(AppConfig):
     name = 'productsearch'
+
+    def ready(self):
+        from . import signals  # noqa: F401
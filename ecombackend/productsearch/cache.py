@@ -0,0 +1,163 @@
+"""
+Two-tier search result cache.
+
+Results are cached under a key built from the normalized query, filters and
+page, prefixed with a version number kept in Django's cache. Saving or
+deleting a ProductForm bumps the version (see productsearch.signals), which
+orphans every cached page at once. A small per-process LRU, bounded by entry
+count and bytes, sits in front of the shared cache.
+"""
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'productsearch:version'
+
+
+class LocalLRU:
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, payload = item
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, ttl):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, payload)
+            self.size += len(payload)
+            while len(self._data) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, payload = self._data.pop(key)
+        self.size -= len(payload)
+
+
+class SearchResultCache:
+
+    def __init__(self, ttl=60, local_max_entries=1000, local_max_bytes=16 * 1024 * 1024):
+        self.ttl = ttl
+        self.local = LocalLRU(local_max_entries, local_max_bytes)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            ttl=getattr(settings, 'SEARCH_CACHE_TTL', 60),
+            local_max_entries=getattr(settings, 'SEARCH_CACHE_LOCAL_MAX_ENTRIES', 1000),
+            local_max_bytes=getattr(settings, 'SEARCH_CACHE_LOCAL_MAX_BYTES', 16 * 1024 * 1024),
+        )
+
+    def version(self):
+        try:
+            version = cache.get(VERSION_KEY)
+            if version is None:
+                # Seed from the clock so a lost counter never reuses an old version
+                cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+                version = cache.get(VERSION_KEY)
+        except Exception:
+            logger.warning("Search cache version unavailable", exc_info=True)
+            return None
+        return version
+
+    def make_key(self, version, query, filters, page, page_size):
+        raw = json.dumps([query, filters, page, page_size], sort_keys=True)
+        return f'productsearch:{version}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+    def get(self, key):
+        payload = self.local.get(key)
+        if payload is not None:
+            self._count('local_hits')
+            return pickle.loads(payload)
+        try:
+            value = cache.get(key)
+        except Exception:
+            logger.warning("Search cache read failed", exc_info=True)
+            value = None
+        if value is None:
+            self._count('misses')
+            return None
+        self._count('shared_hits')
+        self.local.set(key, pickle.dumps(value), self.ttl)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, pickle.dumps(value), self.ttl)
+        try:
+            cache.set(key, value, self.ttl)
+        except Exception:
+            logger.warning("Search cache write failed", exc_info=True)
+
+    def invalidate(self):
+        """Bump the version so every cached result is ignored from now on."""
+        self.local.clear()
+        self._count('invalidations')
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        except Exception:
+            logger.warning("Search cache invalidation failed", exc_info=True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'local_entries': len(self.local),
+                'local_bytes': self.local.size,
+                'local_evictions': self.local.evictions,
+                'ttl': self.ttl,
+            }
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+search_cache = SearchResultCache.from_settings()
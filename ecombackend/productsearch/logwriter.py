@@ -0,0 +1,145 @@
+"""
+Write-behind SearchLog writer.
+
+Search requests only enqueue a SearchLog instance; a background thread
+bulk_creates them every SEARCH_LOG_BATCH_SIZE rows or SEARCH_LOG_FLUSH_INTERVAL
+seconds, whichever comes first. The queue is bounded: when it is full the
+entry is dropped and counted instead of blocking the request.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .models import SearchLog
+
+logger = logging.getLogger(__name__)
+
+
+class SearchLogWriter:
+
+    def __init__(self, batch_size=500, flush_interval=0.5, max_queue_size=10000, enabled=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.enabled = enabled
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            batch_size=getattr(settings, 'SEARCH_LOG_BATCH_SIZE', 500),
+            flush_interval=getattr(settings, 'SEARCH_LOG_FLUSH_INTERVAL', 0.5),
+            max_queue_size=getattr(settings, 'SEARCH_LOG_MAX_QUEUE', 10000),
+            enabled=getattr(settings, 'SEARCH_LOG_ASYNC', True),
+        )
+
+    def log(self, **fields):
+        """Record a search without touching the database on the caller's thread."""
+        if not self.enabled:
+            SearchLog.objects.create(**fields)
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(SearchLog(**fields))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'queued': self._queue.qsize(),
+                'running': self._thread is not None and self._thread.is_alive(),
+            }
+
+    def shutdown(self, timeout=5.0):
+        """Stop the worker after it has written everything still queued."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._stopping.set()
+        thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Forked worker process: the parent's queue and thread are not ours
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='search-log-writer', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                batch = self._next_batch(self.flush_interval)
+                if batch:
+                    self._write(batch)
+            # Drain whatever is left before exiting
+            while True:
+                batch = self._next_batch(0)
+                if not batch:
+                    break
+                self._write(batch)
+        finally:
+            connection.close()
+
+    def _next_batch(self, wait):
+        batch = []
+        deadline = time.monotonic() + wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            SearchLog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception("Failed to write %d search log rows", len(batch))
+            with self._lock:
+                self.failed += len(batch)
+            # Start the next batch on a fresh connection
+            connection.close()
+            return
+        with self._lock:
+            self.written += len(batch)
+
+
+search_log_writer = SearchLogWriter.from_settings()
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from productsearch.models import SearchLog, SearchQueryHourly
+
+
+class Command(BaseCommand):
+    help = "Roll SearchLog rows up into hourly per-query buckets and optionally prune old raw rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int,
+                            help='Recompute this many past hours instead of resuming from the latest bucket')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete raw rows older than SEARCH_LOG_RETENTION_DAYS after rolling up')
+        parser.add_argument('--retention-days', type=int,
+                            help='Override SEARCH_LOG_RETENTION_DAYS for --prune')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        retention = timedelta(days=options['retention_days'] or getattr(settings, 'SEARCH_LOG_RETENTION_DAYS', 30))
+        if options['hours']:
+            start = now - timedelta(hours=options['hours'])
+        else:
+            start = SearchQueryHourly.next_start(default=now - retention)
+
+        written = SearchQueryHourly.rollup(start, now)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} hourly buckets since {start:%Y-%m-%d %H:00}"))
+
+        if options['prune']:
+            # Never prune past the start of this run: those hours are now rolled up
+            cutoff = min(now - retention, start.replace(minute=0, second=0, microsecond=0))
+            deleted = SearchLog.prune(cutoff)
+            self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} raw search log rows older than {cutoff:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 10:51
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # The searched_at index is built CONCURRENTLY so logging isn't blocked
+    atomic = False
+
+    dependencies = [
+        ('products', '0004_product_search'),
+        ('productsearch', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueryHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('query', models.CharField(max_length=255)),
+                ('search_count', models.PositiveIntegerField(default=0)),
+                ('zero_result_count', models.PositiveIntegerField(default=0)),
+                ('results_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='searchlog',
+            index=models.Index(fields=['searched_at'], name='productsear_searched_at_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchqueryhourly',
+            constraint=models.UniqueConstraint(fields=('hour', 'query'), name='productsear_hourly_hour_query_uniq'),
+        ),
+    ]
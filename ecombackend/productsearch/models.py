@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
 from products.models import ProductForm
 from django.contrib.auth.models import User
 
@@ -8,3 +10,89 @@ class SearchLog(models.Model):
     results_count = models.IntegerField()
     searched_at = models.DateTimeField(auto_now_add=True)
     product = models.ForeignKey(ProductForm, on_delete=models.CASCADE, null=True) 
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['searched_at'], name='productsear_searched_at_idx'),
+        ]
+
+    @classmethod
+    def prune(cls, before, batch_size=5000):
+        """Delete raw rows older than `before` in small batches; returns the number deleted."""
+        deleted = 0
+        while True:
+            ids = list(cls.objects.filter(searched_at__lt=before).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += cls.objects.filter(id__in=ids).delete()[0]
+
+
+class SearchQueryHourly(models.Model):
+    """
+    Hourly per-query totals rolled up from SearchLog, so reporting never
+    scans the raw log.
+    """
+    hour = models.DateTimeField()
+    query = models.CharField(max_length=255)
+    search_count = models.PositiveIntegerField(default=0)
+    zero_result_count = models.PositiveIntegerField(default=0)
+    results_total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'query'], name='productsear_hourly_hour_query_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.query} @ {self.hour:%Y-%m-%d %H:00}"
+
+    @property
+    def average_results(self):
+        return self.results_total / self.search_count if self.search_count else 0
+
+    @classmethod
+    def rollup(cls, start, end):
+        """
+        Recompute the buckets for every hour in [start, end) from the raw log.
+        `start` is floored to the hour, so re-running over the same range is
+        safe and picks up late rows.
+        """
+        start = start.replace(minute=0, second=0, microsecond=0)
+        rows = (
+            SearchLog.objects.filter(searched_at__gte=start, searched_at__lt=end)
+            .order_by()
+            .annotate(hour=TruncHour('searched_at'))
+            .values('hour', 'query')
+            .annotate(
+                search_count=Count('id'),
+                zero_result_count=Count('id', filter=Q(results_count=0)),
+                results_total=Sum('results_count'),
+            )
+        )
+        buckets = [cls(**row) for row in rows.iterator(chunk_size=2000)]
+        with transaction.atomic():
+            cls.objects.filter(hour__gte=start, hour__lt=end).delete()
+            cls.objects.bulk_create(buckets, batch_size=1000)
+        return len(buckets)
+
+    @classmethod
+    def next_start(cls, default):
+        """Hour to resume rolling up from: the latest bucket, which may still be filling."""
+        latest = cls.objects.order_by('-hour').values_list('hour', flat=True).first()
+        return latest if latest is not None else default
+
+    @classmethod
+    def top_queries(cls, since, limit=20, zero_results=False):
+        buckets = cls.objects.filter(hour__gte=since)
+        if zero_results:
+            buckets = buckets.filter(zero_result_count__gt=0)
+        order = '-zero_result_count' if zero_results else '-search_count'
+        return list(
+            buckets.values('query')
+            .annotate(
+                search_count=Sum('search_count'),
+                zero_result_count=Sum('zero_result_count'),
+                results_total=Sum('results_total'),
+            )
+            .order_by(order, 'query')[:limit]
+        )
@@ -0,0 +1,133 @@
+"""
+Product search over ProductForm.search_vector (name, type and custom field
+values), with trigram similarity on the name for typo tolerance.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+
+from products.models import ProductForm
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+FACET_FIELDS = ('product_type', 'sellable')
+# All ProductSerializer needs; search_vector and custom_fields stay out of the CTE
+RESULT_FIELDS = ('product_id', 'product_name', 'product_type', 'sellable', 'user', 'created_at')
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent queries look the same."""
+    return ' '.join(query.split()).lower()[:255]
+
+
+def build_tsquery(query):
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    # Prefix-match the last token so results show up while the user is typing
+    return SearchQuery(' & '.join(tokens[:-1] + [f'{tokens[-1]}:*']), config='simple', search_type='raw')
+
+
+def matching_products(query, filters):
+    products = ProductForm.objects.all()
+    for field in FACET_FIELDS:
+        if filters.get(field):
+            products = products.filter(**{field: filters[field]})
+    if not query:
+        return products
+
+    condition = Q(product_name__trigram_similar=query)
+    tsquery = build_tsquery(query)
+    if tsquery is not None:
+        condition |= Q(search_vector=tsquery)
+    return products.filter(condition)
+
+
+def ranked(products, query):
+    if not query:
+        return products.annotate(rank=Value(0.0, output_field=FloatField())).order_by('-created_at', '-product_id')
+    rank = TrigramSimilarity('product_name', query)
+    tsquery = build_tsquery(query)
+    if tsquery is not None:
+        rank = rank + SearchRank(F('search_vector'), tsquery)
+    return products.annotate(rank=rank).order_by('-rank', '-product_id')
+
+
+def search_sql(products, offset, limit):
+    """
+    One statement for a results page and its counts: the ranked matches are
+    materialized once in a CTE, then UNION ALL reads the page rows (kind 0)
+    and the GROUPING SETS rows counting matches per product_type, per
+    sellable value and in total (kind 1) from it.
+    """
+    qn = connection.ops.quote_name
+    # In model order, as Model.from_db expects
+    fields = [field for field in ProductForm._meta.concrete_fields if field.name in RESULT_FIELDS]
+    attnames = [field.attname for field in fields]
+    inner_sql, params = products.order_by().values(*attnames, 'rank').query.sql_with_params()
+
+    def column(name):
+        return qn('rank') if name == 'rank' else qn(ProductForm._meta.get_field(name).column)
+
+    order = ', '.join(
+        f"{column(name.lstrip('-'))} {'DESC' if name.startswith('-') else 'ASC'}"
+        for name in products.query.order_by
+    )
+    page_columns = ', '.join([qn(field.column) for field in fields] + [qn('rank')])
+    facet_columns = ', '.join(
+        [qn(field.column) if field.name in FACET_FIELDS else 'NULL' for field in fields] + ['NULL']
+    )
+    grouping = ', '.join(f'GROUPING({qn(field)})' for field in FACET_FIELDS)
+    grouping_sets = ', '.join(f'({qn(field)})' for field in FACET_FIELDS)
+    sql = (
+        f'WITH matched AS MATERIALIZED ({inner_sql}) '
+        f'(SELECT 0, {page_columns}, NULL, NULL, NULL FROM matched ORDER BY {order} LIMIT %s OFFSET %s) '
+        'UNION ALL '
+        f'(SELECT 1, {facet_columns}, {grouping}, COUNT(*) FROM matched GROUP BY GROUPING SETS ({grouping_sets}, ()))'
+    )
+    return sql, (*params, limit, offset), fields
+
+
+def search_products(query, filters, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """Return one page of ranked results plus the total and facet counts, in one query."""
+    page = max(page, 1)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    products = ranked(matching_products(query, filters), query)
+    sql, params, fields = search_sql(products, (page - 1) * page_size, page_size)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    attnames = [field.attname for field in fields]
+    results = []
+    facets = {field: [] for field in FACET_FIELDS}
+    total = 0
+    for kind, *values in rows:
+        values, rank, (type_rolled_up, sellable_rolled_up, count) = (
+            values[:len(fields)], values[len(fields)], values[len(fields) + 1:]
+        )
+        if kind == 0:
+            # The rest of the row is deferred, as with .only()
+            product = ProductForm.from_db(connection.alias, attnames, values)
+            product.rank = rank
+            results.append(product)
+            continue
+        row = dict(zip((field.name for field in fields), values))
+        if not type_rolled_up:
+            facets['product_type'].append({'value': row['product_type'], 'count': count})
+        elif not sellable_rolled_up:
+            facets['sellable'].append({'value': row['sellable'], 'count': count})
+        else:
+            total = count
+    for values in facets.values():
+        values.sort(key=lambda facet: (-facet['count'], str(facet['value'])))
+    return {
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'results': results,
+        'facets': facets,
+    }
@@ -3,6 +3,8 @@ from products.models import ProductForm
 from .models import SearchLog
 
 class ProductSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True, default=None)
+
     class Meta:
         model = ProductForm  
-        fields = ['product_id', 'product_name', 'product_type', 'price', 'sellable', 'user']
+        fields = ['product_id', 'product_name', 'product_type', 'sellable', 'user', 'rank']
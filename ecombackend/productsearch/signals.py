@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import ProductForm
+from .cache import search_cache
+
+
+@receiver(post_save, sender=ProductForm)
+@receiver(post_delete, sender=ProductForm)
+def invalidate_search_cache(sender, **kwargs):
+    # After commit, so a concurrent search can't re-cache the old rows
+    transaction.on_commit(search_cache.invalidate)
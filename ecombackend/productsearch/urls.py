@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import SearchProductsAPI
+from .views import SearchProductsAPI, SearchLogStatsAPI, SearchCacheStatsAPI, SearchAnalyticsAPI
 
 urlpatterns = [
     path('search/', SearchProductsAPI.as_view()),
+    path('search/log-stats/', SearchLogStatsAPI.as_view()),
+    path('search/cache-stats/', SearchCacheStatsAPI.as_view()),
+    path('search/analytics/', SearchAnalyticsAPI.as_view()),
 ]
@@ -1,23 +1,92 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import SearchLog
+from rest_framework import status
+from users.permissions import IsAdmin
+from .cache import search_cache
+from .logwriter import search_log_writer
+from .models import SearchQueryHourly
 from .serializers import ProductSerializer
+from .search import DEFAULT_PAGE_SIZE, FACET_FIELDS, normalize_query, search_products
 
 
 class SearchProductsAPI(APIView):
     def get(self, request):
-        keyword = request.GET.get("q", "")
-        
-        
-        from products.models import Product
+        keyword = normalize_query(request.GET.get("q", ""))
+        filters = {field: request.GET.get(field) for field in FACET_FIELDS}
+        try:
+            page = int(request.GET.get("page", 1))
+            page_size = int(request.GET.get("page_size", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "page and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = Product.objects.filter(name__icontains=keyword)
+        version = search_cache.version()
+        cache_key = search_cache.make_key(version, keyword, filters, page, page_size)
+        data = search_cache.get(cache_key) if version is not None else None
+        if data is None:
+            result = search_products(keyword, filters, page=page, page_size=page_size)
+            serializer = ProductSerializer(result['results'], many=True)
+            data = {
+                'query': keyword,
+                'count': result['count'],
+                'page': result['page'],
+                'page_size': result['page_size'],
+                'results': serializer.data,
+                'facets': result['facets'],
+            }
+            if version is not None:
+                search_cache.set(cache_key, data)
 
-        SearchLog.objects.create(
+        search_log_writer.log(
             user=request.user if request.user.is_authenticated else None,
             query=keyword,
-            results_count=results.count()
+            results_count=data['count']
         )
+        return Response(data)
+
+
+class SearchLogStatsAPI(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(search_log_writer.stats())
+
+
+class SearchAnalyticsAPI(APIView):
+    """Top and zero-result queries over the last `days`, read from the hourly rollups."""
+    permission_classes = [IsAdmin]
 
-        serializer = ProductSerializer(results, many=True)
-        return Response(serializer.data)
+    def get(self, request):
+        try:
+            days = min(max(int(request.GET.get("days", 7)), 1), 365)
+            limit = min(max(int(request.GET.get("limit", 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "days and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now() - timedelta(days=days)
+        return Response({
+            'days': days,
+            'top_queries': self.format(SearchQueryHourly.top_queries(since, limit)),
+            'zero_result_queries': self.format(SearchQueryHourly.top_queries(since, limit, zero_results=True)),
+        })
+
+    @staticmethod
+    def format(rows):
+        return [
+            {
+                'query': row['query'],
+                'search_count': row['search_count'],
+                'zero_result_count': row['zero_result_count'],
+                'average_results': round(row['results_total'] / row['search_count'], 2) if row['search_count'] else 0,
+            }
+            for row in rows
+        ]
+
+
+class SearchCacheStatsAPI(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(search_cache.stats())
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from users.providers import AsyncProviderClient, ProviderClient
+from users.stub_provider import start_in_thread
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one-off requests calls with the pooled ProviderClient (sync and async) "
+        "against a local stub provider."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Calls per run (default: 500)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel callers (default: 8)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Stub latency in seconds')
+        parser.add_argument('--url', help='Benchmark an already running stub instead of starting one')
+
+    def handle(self, *args, **options):
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server, base_url = start_in_thread(latency=options['latency'])
+        url = f"{base_url.rstrip('/')}/me"
+        count, concurrency = max(options['requests'], 1), max(options['concurrency'], 1)
+        client = ProviderClient(pool_size=concurrency)
+
+        try:
+            self.report('requests.get (no session)', count, self.run_threads(
+                lambda i: requests.get(url, params={'access_token': f'token-{i}'}, timeout=10).json(),
+                count, concurrency,
+            ))
+            self.report('ProviderClient (pooled)', count, self.run_threads(
+                lambda i: client.get_json(url, params={'access_token': f'token-{i}'}),
+                count, concurrency,
+            ))
+            self.report('AsyncProviderClient', count, asyncio.run(
+                self.run_async(AsyncProviderClient(client), url, count, concurrency)
+            ))
+        finally:
+            client.close()
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    @staticmethod
+    def run_threads(call, count, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(call, range(count)))
+        return time.perf_counter() - started
+
+    @staticmethod
+    async def run_async(client, url, count, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+
+        async def call(i):
+            async with limit:
+                return await client.get_json(url, params={'access_token': f'token-{i}'})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(count)))
+        return time.perf_counter() - started
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f"{label:<28} {elapsed:7.2f}s  {count / elapsed:8.0f} req/s  {elapsed / count * 1000:6.2f} ms/req")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from users.stub_provider import make_server
+
+
+class Command(BaseCommand):
+    help = "Serve stub social login provider endpoints for local testing (see SOCIAL_PROVIDER_URLS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+
+    def handle(self, *args, **options):
+        server = make_server(options['host'], options['port'], options['latency'])
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f"Stub provider listening on http://{host}:{port}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
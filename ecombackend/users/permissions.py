@@ -1,22 +1,16 @@
 from rest_framework.permissions import BasePermission
+from .roles import get_role
+
+# Roles come from users.roles (cache / token claim / database), not user.userrole
 
 class IsEmployee(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if not user.is_authenticated:
-            return False
-        return hasattr(user, 'userrole') and user.userrole.role in ['employee', 'superemployee', 'admin']
+        return get_role(request) in ['employee', 'superemployee', 'admin']
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if not user.is_authenticated:
-            return False
-        return hasattr(user, 'userrole') and user.userrole.role == 'admin'
+        return get_role(request) == 'admin'
 
 class IsSuperEmployee(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if not user.is_authenticated:
-            return False
-        return hasattr(user, 'userrole') and user.userrole.role == 'superemployee'
+        return get_role(request) == 'superemployee'
@@ -0,0 +1,197 @@
+"""
+Outbound HTTP for the social login providers.
+
+ProviderClient keeps one pooled keep-alive requests.Session for the whole
+process, so repeat logins skip the TCP and TLS handshakes. Every call gets
+connect and read timeouts per attempt plus a total budget (SOCIAL_HTTP_TOTAL_TIMEOUT)
+that covers all attempts, their backoff and reading the body. GETs are retried
+with exponential backoff on connection errors, timeouts, 429 and 5xx; POSTs are
+not retried. Authorization code exchanges must pass retry=False whatever their
+method: a code can only be redeemed once, and a retried exchange whose first
+attempt reached the provider just fails with an invalid code.
+
+AsyncProviderClient runs the same calls off the event loop for ASGI code.
+"""
+import json
+import logging
+import threading
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+import urllib3
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_URLS = {
+    'tiktok': 'https://open-api.tiktok.com',
+    'facebook': 'https://graph.facebook.com',
+    'instagram_api': 'https://api.instagram.com',
+    'instagram_graph': 'https://graph.instagram.com',
+}
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class ProviderError(Exception):
+    """A provider could not be reached or didn't answer with JSON."""
+
+
+def provider_url(name, path):
+    """Absolute URL for `path` on a provider; SOCIAL_PROVIDER_URLS can point them at a stub."""
+    base = getattr(settings, 'SOCIAL_PROVIDER_URLS', {}).get(name) or DEFAULT_PROVIDER_URLS[name]
+    return f"{base.rstrip('/')}/{path.lstrip('/')}"
+
+
+class ProviderClient:
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, total_timeout=15, retries=2, backoff=0.3,
+                 pool_size=20):
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            connect_timeout=getattr(settings, 'SOCIAL_HTTP_CONNECT_TIMEOUT', 3.05),
+            read_timeout=getattr(settings, 'SOCIAL_HTTP_READ_TIMEOUT', 10),
+            total_timeout=getattr(settings, 'SOCIAL_HTTP_TOTAL_TIMEOUT', 15),
+            retries=getattr(settings, 'SOCIAL_HTTP_RETRIES', 2),
+            backoff=getattr(settings, 'SOCIAL_HTTP_BACKOFF', 0.3),
+            pool_size=getattr(settings, 'SOCIAL_HTTP_POOL_SIZE', 20),
+        )
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self.build_session()
+        return self._session
+
+    def build_session(self):
+        # Retries happen in request_json, where they count against the total budget
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=self.pool_size, max_retries=0)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request_json(self, method, url, retry=None, **kwargs):
+        """
+        Call a provider and decode its JSON answer. retry defaults to True for
+        GETs and False otherwise; raises ProviderError once the attempts or the
+        total budget run out.
+        """
+        if retry is None:
+            retry = method == 'GET'
+        deadline = time.monotonic() + self.total_timeout
+        attempts = self.retries + 1 if retry else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                status_code, content = self.fetch(method, url, deadline, **kwargs)
+            except requests.RequestException as exc:
+                logger.warning("Provider request %s %s failed: %s", method, url, exc)
+                if last or not self.backoff_within(deadline, attempt):
+                    raise ProviderError(str(exc)) from exc
+                continue
+            if status_code in RETRY_STATUSES and not last and self.backoff_within(deadline, attempt):
+                logger.warning("Provider request %s %s answered %s, retrying", method, url, status_code)
+                continue
+            try:
+                return json.loads(content)
+            except ValueError as exc:
+                raise ProviderError(f"Provider returned non-JSON response ({status_code})") from exc
+
+    def fetch(self, method, url, deadline, **kwargs):
+        """One attempt: (status code, body), with every timeout clipped to the deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"Gave up after {self.total_timeout}s")
+        connect_timeout, read_timeout = self.timeout
+        kwargs['timeout'] = (min(connect_timeout, remaining), min(read_timeout, remaining))
+        with self.session.request(method, url, stream=True, **kwargs) as response:
+            # The read timeout only bounds each socket read, so a body trickling
+            # in is cut off here; read1 returns what one socket read brought
+            chunks = []
+            try:
+                while chunk := response.raw.read1(65536, decode_content=True):
+                    chunks.append(chunk)
+                    if time.monotonic() > deadline:
+                        raise requests.Timeout(f"Gave up after {self.total_timeout}s reading the response")
+            except urllib3.exceptions.HTTPError as exc:
+                # Reading .raw bypasses requests' own wrapping of urllib3 errors
+                raise requests.ConnectionError(exc) from exc
+            return response.status_code, b''.join(chunks)
+
+    def backoff_within(self, deadline, attempt):
+        """Sleep before the next attempt; False if that would overrun the deadline."""
+        delay = self.backoff * (2 ** attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def get_json(self, url, retry=True, **kwargs):
+        return self.request_json('GET', url, retry=retry, **kwargs)
+
+    def post_json(self, url, retry=False, **kwargs):
+        return self.request_json('POST', url, retry=retry, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class AsyncProviderClient:
+    """Awaitable wrapper: calls run in worker threads but share the pooled session."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get_json(self, url, retry=True, **kwargs):
+        return await sync_to_async(self.client.get_json, thread_sensitive=False)(url, retry=retry, **kwargs)
+
+    async def post_json(self, url, retry=False, **kwargs):
+        return await sync_to_async(self.client.post_json, thread_sensitive=False)(url, retry=retry, **kwargs)
+
+
+def cached_user_info(provider, open_id, fetch):
+    """
+    Return a provider's user info for `open_id`, calling fetch() only when no
+    copy younger than SOCIAL_USER_INFO_TTL is cached. Only call this after the
+    token exchange has proven the login belongs to `open_id`. Without an
+    open_id nothing is cached, since the entry couldn't belong to one user.
+    """
+    if not open_id:
+        return fetch()
+    key = f'users:userinfo:{provider}:{open_id}'
+    try:
+        info = cache.get(key)
+    except Exception:
+        logger.warning("User info cache unavailable", exc_info=True)
+        info = None
+    if info is not None:
+        return info
+    info = fetch()
+    if info:
+        try:
+            cache.set(key, info, getattr(settings, 'SOCIAL_USER_INFO_TTL', 300))
+        except Exception:
+            logger.warning("User info cache unavailable", exc_info=True)
+    return info
+
+
+provider_client = ProviderClient.from_settings()
+async_provider_client = AsyncProviderClient(provider_client)
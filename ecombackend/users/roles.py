@@ -0,0 +1,111 @@
+"""
+Role resolution for permission checks.
+
+A user's UserRole and group names are resolved from, in order:
+
+1. the Django cache (users:roles:<id>), dropped whenever they change;
+2. the `role`/`groups` claims generate_jwt puts in the access token, unless
+   the user's roles changed after the token was issued;
+3. the database, refilling the cache.
+
+On the hot path a permission check therefore costs no queries.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import UserRole
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(user_id):
+    return f'users:roles:{user_id}'
+
+
+def changed_key(user_id):
+    return f'users:roles-changed:{user_id}'
+
+
+def load(user_id):
+    """Read a user's role (None without a UserRole) and group names from the database."""
+    return {
+        'role': UserRole.objects.filter(user_id=user_id).values_list('role', flat=True).first(),
+        'groups': sorted(Group.objects.filter(user__id=user_id).values_list('name', flat=True)),
+    }
+
+
+def from_token(user_id, token):
+    """Roles carried by a JWT, or None if it has none or they changed since it was issued."""
+    if token is None or not hasattr(token, 'get') or 'role' not in token:
+        return None
+    try:
+        changed_at = cache.get(changed_key(user_id))
+    except Exception:
+        logger.warning("Role cache unavailable", exc_info=True)
+        return None
+    if changed_at is not None and token.get('iat', 0) <= changed_at:
+        return None
+    return {'role': token['role'], 'groups': list(token.get('groups', []))}
+
+
+def resolve(user, token=None):
+    """Return {'role': ..., 'groups': [...]} for an authenticated user."""
+    try:
+        info = cache.get(cache_key(user.pk))
+    except Exception:
+        logger.warning("Role cache unavailable", exc_info=True)
+        info = None
+    if info is None:
+        info = from_token(user.pk, token)
+    if info is None:
+        info = load(user.pk)
+        try:
+            cache.set(cache_key(user.pk), info, getattr(settings, 'ROLE_CACHE_TTL', 3600))
+        except Exception:
+            logger.warning("Role cache unavailable", exc_info=True)
+    return info
+
+
+def request_roles(request):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    return resolve(user, request.auth)
+
+
+def get_role(request):
+    info = request_roles(request)
+    return info['role'] if info else None
+
+
+def has_group(request, name):
+    info = request_roles(request)
+    return bool(info) and name in info['groups']
+
+
+def token_claims(user):
+    """Claims generate_jwt embeds in issued tokens."""
+    info = resolve(user)
+    return {'role': info['role'], 'groups': info['groups']}
+
+
+def invalidate(user_ids):
+    """Forget cached roles and mark tokens issued before now as stale, for these users."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+    # Tokens older than the marker are ignored, so it must outlive them all. The
+    # claims sit on the refresh token and access tokens minted from it copy its
+    # iat, so that is the refresh token's lifetime, not the access token's.
+    lifetime = int(max(jwt_settings.ACCESS_TOKEN_LIFETIME, jwt_settings.REFRESH_TOKEN_LIFETIME).total_seconds())
+    now = int(time.time())
+    try:
+        cache.delete_many([cache_key(user_id) for user_id in user_ids])
+        cache.set_many({changed_key(user_id): now for user_id in user_ids}, lifetime)
+    except Exception:
+        logger.warning("Role cache invalidation failed", exc_info=True)
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import roles
+from .models import UserRole
+
+
+def invalidate(user_ids):
+    # After commit, so a concurrent request can't re-cache the old roles
+    transaction.on_commit(lambda: roles.invalidate(user_ids))
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role(sender, instance, **kwargs):
+    invalidate([instance.user_id])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate([instance.pk])
+    elif action == 'pre_clear':
+        # Group side: after the clear there is no way to tell who was in it
+        invalidate(list(instance.user_set.values_list('pk', flat=True)))
+    elif pk_set:
+        invalidate(list(pk_set))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_rename(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate(list(instance.user_set.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_group_delete(sender, instance, **kwargs):
+    invalidate(list(instance.user_set.values_list('pk', flat=True)))
@@ -0,0 +1,85 @@
+"""
+Local stand-in for the TikTok, Facebook and Instagram OAuth endpoints, for
+tests and latency benchmarks. Point every SOCIAL_PROVIDER_URLS entry at it.
+Codes and tokens are echoed back, so the same code always yields the same
+user.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real providers
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every response on a reused connection
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_GET(self):
+        self.respond(self.route())
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        self.respond(self.route(form))
+
+    def route(self, form=None):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        params.update({key: values[0] for key, values in (form or {}).items()})
+        code = params.get('code', '')
+        path = url.path.rstrip('/')
+
+        if path.endswith('/oauth/access_token'):
+            # One body that satisfies the TikTok, Facebook and Instagram token parsers
+            return {
+                'access_token': f'token-{code}',
+                'user_id': code,
+                'data': {'access_token': f'token-{code}', 'open_id': code},
+            }
+        if path == '/oauth/userinfo':
+            open_id = params.get('open_id', '')
+            return {'data': {'display_name': f'tiktok_{open_id}', 'email': f'{open_id}@tiktok.example'}}
+        token = params.get('access_token', '').removeprefix('token-')
+        if path == '/me':
+            return {'id': token, 'name': f'facebook_{token}', 'email': f'{token}@facebook.example'}
+        return {'id': path.lstrip('/'), 'username': f'instagram_{path.lstrip("/")}'}
+
+    def respond(self, payload, status=200):
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out first, which is what latency runs are for
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, handler_class=StubProviderHandler):
+    """
+    Build (but don't start) a stub server; port 0 picks a free port. Tests
+    pass a StubProviderHandler subclass to script other answers.
+    """
+    handler = type('Handler', (handler_class,), {'latency': latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start a stub server on a daemon thread; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}'
@@ -1,3 +1,102 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from .providers import ProviderClient, ProviderError, cached_user_info, provider_url
+from .stub_provider import StubProviderHandler, start_in_thread
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class StubProviderTestCase(APITestCase):
+    """Runs a stub provider per test and points every SOCIAL_PROVIDER_URLS entry at it."""
+    handler_class = StubProviderHandler
+    latency = 0.0
+
+    def setUp(self):
+        server, base_url = start_in_thread(handler_class=self.handler_class, latency=self.latency)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        urls = {name: base_url for name in ('tiktok', 'facebook', 'instagram_api', 'instagram_graph')}
+        settings_override = override_settings(SOCIAL_PROVIDER_URLS=urls, CACHES=LOCAL_CACHE)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+
+class NoIdHandler(StubProviderHandler):
+    """A token response that carries a token but no user id."""
+
+    def route(self, form=None):
+        if self.path.split('?')[0].rstrip('/').endswith('/oauth/access_token'):
+            return {'access_token': 'token-x', 'data': {'access_token': 'token-x'}}
+        return super().route(form)
+
+
+class MissingProviderIdTests(StubProviderTestCase):
+    handler_class = NoIdHandler
+
+    def test_tiktok_login_without_open_id_is_refused(self):
+        for code in ('first', 'second'):
+            response = self.client.get('/api/users/social/tiktok/callback/', {'code': code})
+            self.assertEqual(response.status_code, 400, response.content)
+        self.assertFalse(User.objects.exists())
+
+    def test_instagram_login_without_user_id_is_refused(self):
+        response = self.client.get('/api/users/social/instagram/callback/', {'code': 'first'})
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertFalse(User.objects.exists())
+
+    def test_user_info_without_open_id_is_not_cached(self):
+        cached_user_info('tiktok', None, lambda: {'display_name': 'first'})
+        info = cached_user_info('tiktok', None, lambda: {'display_name': 'second'})
+        self.assertEqual(info, {'display_name': 'second'})
+
+
+class FailingHandler(StubProviderHandler):
+    """Answers 503 to everything and records each request path."""
+    requests = []
+
+    def respond(self, payload, status=200):
+        self.requests.append(self.path.split('?')[0])
+        super().respond({'error': 'unavailable'}, status=503)
+
+
+@override_settings(SOCIAL_HTTP_RETRIES=3, SOCIAL_HTTP_BACKOFF=0.01)
+class ProviderRetryTests(StubProviderTestCase):
+    handler_class = FailingHandler
+
+    def setUp(self):
+        super().setUp()
+        FailingHandler.requests = []
+
+    def test_5xx_is_retried_up_to_the_configured_retries(self):
+        client = ProviderClient.from_settings()
+        with self.assertLogs('users.providers', 'WARNING') as logs:
+            body = client.get_json(provider_url('facebook', '/me'), params={'access_token': 'token-a'})
+        self.assertEqual(body, {'error': 'unavailable'})
+        self.assertEqual(FailingHandler.requests, ['/me'] * 4)
+        self.assertEqual(len(logs.output), 3)
+
+    def test_code_exchanges_are_not_retried(self):
+        # The module client retries GETs, and Facebook exchanges its code with one
+        for path in ('/api/users/social/tiktok/callback/', '/api/users/social/facebook/callback/',
+                     '/api/users/social/instagram/callback/'):
+            FailingHandler.requests = []
+            self.client.get(path, {'code': 'once'})
+            self.assertEqual(len(FailingHandler.requests), 1, path)
+
+
+@override_settings(SOCIAL_HTTP_TOTAL_TIMEOUT=0.5, SOCIAL_HTTP_READ_TIMEOUT=10)
+class ProviderTotalTimeoutTests(StubProviderTestCase):
+    latency = 2.0
+
+    def test_total_timeout_caps_a_slow_provider(self):
+        client = ProviderClient.from_settings()
+        started = time.monotonic()
+        with self.assertRaises(ProviderError), self.assertLogs('users.providers', 'WARNING'):
+            client.get_json(provider_url('facebook', '/me'), params={'access_token': 'token-a'})
+        self.assertLess(time.monotonic() - started, 1.5)
@@ -1,23 +1,35 @@
 import os
-import requests
 from dotenv import load_dotenv
 from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import UserRole
+from .providers import ProviderError, cached_user_info, provider_client, provider_url
+from .roles import token_claims
 from .serializers import UserSerializer
 
 load_dotenv()
 
 def get_or_create_user(username, email, role='user'):
-    user, _ = User.objects.get_or_create(username=username, defaults={'email': email})
-    userrole, _ = UserRole.objects.get_or_create(user=user, defaults={'role': role})
+    # One transaction, so a user never exists without a role. Concurrent first
+    # logins are safe: username and UserRole.user are unique, and get_or_create
+    # falls back to fetching the row when the other login inserts it first.
+    with transaction.atomic():
+        user, _ = User.objects.get_or_create(username=username, defaults={'email': email})
+        UserRole.objects.get_or_create(user=user, defaults={'role': role})
     return user
 
+def provider_unavailable(provider):
+    return Response({"error": f"{provider} is unavailable, try again"}, status=status.HTTP_502_BAD_GATEWAY)
+
 def generate_jwt(user):
     refresh = RefreshToken.for_user(user)
+    # Copied into the access token, so permission checks can skip the database
+    for claim, value in token_claims(user).items():
+        refresh[claim] = value
     return {'access': str(refresh.access_token), 'refresh': str(refresh)}
 
 # ---------------- TikTok ----------------
@@ -27,21 +39,30 @@ class TikTokLoginCallback(APIView):
         if not code:
             return Response({"error": "Authorization code is required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        token_url = "https://open-api.tiktok.com/oauth/access_token/"
+        token_url = provider_url('tiktok', "/oauth/access_token/")
         data = {
             "client_key": os.getenv("TIKTOK_CLIENT_KEY"),
             "client_secret": os.getenv("TIKTOK_CLIENT_SECRET"),
             "code": code,
             "grant_type": "authorization_code"
         }
-        token_resp = requests.post(token_url, data=data).json()
+        try:
+            token_resp = provider_client.post_json(token_url, data=data, retry=False)
+        except ProviderError:
+            return provider_unavailable("TikTok")
         access_token = token_resp.get('data', {}).get('access_token')
         open_id = token_resp.get('data', {}).get('open_id')
-        if not access_token:
+        # Without the id the login can't be tied to one account (or one user info cache entry)
+        if not access_token or not open_id:
             return Response({"error": "Failed to get TikTok access token"}, status=status.HTTP_400_BAD_REQUEST)
         
-        user_info_url = f"https://open-api.tiktok.com/oauth/userinfo/?access_token={access_token}&open_id={open_id}"
-        user_info = requests.get(user_info_url).json().get('data', {})
+        user_info_url = provider_url('tiktok', "/oauth/userinfo/")
+        try:
+            user_info = cached_user_info('tiktok', open_id, lambda: provider_client.get_json(
+                user_info_url, params={"access_token": access_token, "open_id": open_id}
+            ).get('data', {}))
+        except ProviderError:
+            return provider_unavailable("TikTok")
         username = user_info.get('display_name') or f"tiktok_{open_id}"
         email = user_info.get('email') or f"{username}@tiktok.com"
 
@@ -57,20 +78,28 @@ class FacebookLoginCallback(APIView):
         if not code:
             return Response({"error": "Authorization code is required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        token_url = "https://graph.facebook.com/v17.0/oauth/access_token"
+        token_url = provider_url('facebook', "/v17.0/oauth/access_token")
         params = {
             "client_id": os.getenv("FB_APP_ID"),
             "client_secret": os.getenv("FB_APP_SECRET"),
             "redirect_uri": os.getenv("FB_REDIRECT_URI"),
             "code": code
         }
-        token_resp = requests.get(token_url, params=params).json()
+        try:
+            token_resp = provider_client.get_json(token_url, params=params, retry=False)
+        except ProviderError:
+            return provider_unavailable("Facebook")
         access_token = token_resp.get("access_token")
         if not access_token:
             return Response({"error": "Failed to get Facebook access token"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user_info_url = "https://graph.facebook.com/me"
-        user_info = requests.get(user_info_url, params={"access_token": access_token, "fields": "id,name,email"}).json()
+        user_info_url = provider_url('facebook', "/me")
+        try:
+            user_info = provider_client.get_json(
+                user_info_url, params={"access_token": access_token, "fields": "id,name,email"}
+            )
+        except ProviderError:
+            return provider_unavailable("Facebook")
         username = user_info.get('name')
         email = user_info.get('email') or f"{username}@facebook.com"
 
@@ -86,7 +115,7 @@ class InstagramLoginCallback(APIView):
         if not code:
             return Response({"error": "Authorization code is required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        token_url = "https://api.instagram.com/oauth/access_token"
+        token_url = provider_url('instagram_api', "/oauth/access_token")
         data = {
             "client_id": os.getenv("IG_APP_ID"),
             "client_secret": os.getenv("IG_APP_SECRET"),
@@ -94,14 +123,22 @@ class InstagramLoginCallback(APIView):
             "redirect_uri": os.getenv("IG_REDIRECT_URI"),
             "code": code
         }
-        token_resp = requests.post(token_url, data=data).json()
+        try:
+            token_resp = provider_client.post_json(token_url, data=data, retry=False)
+        except ProviderError:
+            return provider_unavailable("Instagram")
         access_token = token_resp.get("access_token")
         user_id = token_resp.get("user_id")
-        if not access_token:
+        if not access_token or not user_id:
             return Response({"error": "Failed to get Instagram access token"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user_info_url = f"https://graph.instagram.com/{user_id}?fields=id,username"
-        user_info = requests.get(user_info_url, params={"access_token": access_token}).json()
+        user_info_url = provider_url('instagram_graph', f"/{user_id}")
+        try:
+            user_info = cached_user_info('instagram', user_id, lambda: provider_client.get_json(
+                user_info_url, params={"fields": "id,username", "access_token": access_token}
+            ))
+        except ProviderError:
+            return provider_unavailable("Instagram")
         username = user_info.get('username')
         email = f"{username}@instagram.com"
 